@@ -0,0 +1,50 @@
+import time
+
+
+class Capabilities:
+    class Defaults:
+        TTL = 86400  # seconds
+        # Missing support is checked again sooner, it may have been a fluke
+        NEGATIVE_TTL = 600  # seconds
+
+    def __init__(
+        self, ttl=Defaults.TTL, negative_ttl=Defaults.NEGATIVE_TTL, clock=time.monotonic
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self.version = None
+        self.__batch_outputs = None
+        self.__expires_at = None
+
+    # Whether Satellite can poll outputs of many hosts at once, None if unknown
+    @property
+    def batch_outputs(self):
+        if self.__expires_at is None:
+            return None
+        if self.clock() >= self.__expires_at:
+            self.__batch_outputs = self.__expires_at = None
+        return self.__batch_outputs
+
+    def remember_batch_outputs(self, supported):
+        self.__batch_outputs = supported
+        ttl = self.ttl if supported else self.negative_ttl
+        self.__expires_at = self.clock() + ttl
+
+    # An upgraded Satellite may support more than before, so everything
+    # learned about the previous version is forgotten
+    def observe_version(self, version):
+        if version is None or version == self.version:
+            return
+        if self.version is not None:
+            self.__batch_outputs = self.__expires_at = None
+        self.version = version
+
+
+capabilities_by_url = {}
+
+
+def capabilities(url):
+    if url not in capabilities_by_url:
+        capabilities_by_url[url] = Capabilities()
+    return capabilities_by_url[url]
@@ -12,18 +12,90 @@ class Config:
         TEXT_UPDATES = False
         TEXT_UPDATE_INTERVAL = 5000
         TEXT_UPDATE_FULL = True
+        POLL_SHARD_SIZE = 1000
+        POLL_CONCURRENCY = 4
+        TRIGGER_BATCH_SIZE = 0  # A single job invocation for all hosts
+        TRIGGER_CONCURRENCY = 4
+        ADAPTIVE_POLLING = False
+        POLL_INTERVAL_MIN = 1000
+        POLL_INTERVAL_MAX = 60000
+        # Timeouts are in milliseconds, 0 turns them off
+        RUN_TIMEOUT = 0
+        HOST_TIMEOUT = 0
+        PROGRESS_TIMEOUT = 0
+        # Bytes of console output kept in memory per host before using a file
+        OUTPUT_MEMORY_LIMIT = 1024 * 1024
+        # Full updates only carry the new output, every nth one all of it
+        TEXT_UPDATE_DELTA = False
+        TEXT_UPDATE_CHECKPOINT = 10
+        # Bytes of console output sent per host and per run, 0 turns them off
+        HOST_CONSOLE_LIMIT = 0
+        RUN_CONSOLE_LIMIT = 0
 
-    def __init__(self, text_updates, text_update_interval, text_update_full):
+    def __init__(
+        self,
+        text_updates,
+        text_update_interval,
+        text_update_full,
+        poll_shard_size=Defaults.POLL_SHARD_SIZE,
+        poll_concurrency=Defaults.POLL_CONCURRENCY,
+        trigger_batch_size=Defaults.TRIGGER_BATCH_SIZE,
+        trigger_concurrency=Defaults.TRIGGER_CONCURRENCY,
+        adaptive_polling=Defaults.ADAPTIVE_POLLING,
+        poll_interval_min=Defaults.POLL_INTERVAL_MIN,
+        poll_interval_max=Defaults.POLL_INTERVAL_MAX,
+        run_timeout=Defaults.RUN_TIMEOUT,
+        host_timeout=Defaults.HOST_TIMEOUT,
+        progress_timeout=Defaults.PROGRESS_TIMEOUT,
+        output_memory_limit=Defaults.OUTPUT_MEMORY_LIMIT,
+        text_update_delta=Defaults.TEXT_UPDATE_DELTA,
+        text_update_checkpoint=Defaults.TEXT_UPDATE_CHECKPOINT,
+        host_console_limit=Defaults.HOST_CONSOLE_LIMIT,
+        run_console_limit=Defaults.RUN_CONSOLE_LIMIT,
+    ):
         self.text_updates = text_updates
         self.text_update_interval = (
             text_update_interval // 1000
         )  # Store the interval in seconds
         self.text_update_full = text_update_full
+        self.poll_shard_size = poll_shard_size
+        self.poll_concurrency = poll_concurrency
+        self.trigger_batch_size = trigger_batch_size
+        self.trigger_concurrency = trigger_concurrency
+        self.adaptive_polling = adaptive_polling
+        # Store the intervals in seconds
+        self.poll_interval_min = poll_interval_min / 1000
+        self.poll_interval_max = poll_interval_max / 1000
+        self.run_timeout = run_timeout / 1000
+        self.host_timeout = host_timeout / 1000
+        self.progress_timeout = progress_timeout / 1000
+        self.output_memory_limit = output_memory_limit
+        self.text_update_delta = text_update_delta
+        self.text_update_checkpoint = text_update_checkpoint
+        self.host_console_limit = host_console_limit
+        self.run_console_limit = run_console_limit
 
     @classmethod
     def from_raw(cls, raw={}):
         return cls(
-            raw["text_updates"], raw["text_update_interval"], raw["text_update_full"]
+            raw["text_updates"],
+            raw["text_update_interval"],
+            raw["text_update_full"],
+            raw["poll_shard_size"],
+            raw["poll_concurrency"],
+            raw["trigger_batch_size"],
+            raw["trigger_concurrency"],
+            raw["adaptive_polling"],
+            raw["poll_interval_min"],
+            raw["poll_interval_max"],
+            raw["run_timeout"],
+            raw["host_timeout"],
+            raw["progress_timeout"],
+            raw["output_memory_limit"],
+            raw["text_update_delta"],
+            raw["text_update_checkpoint"],
+            raw["host_console_limit"],
+            raw["run_console_limit"],
         )
 
     @classmethod
@@ -31,6 +103,21 @@ class Config:
         text_updates = raw.get("text_updates")
         text_update_interval = raw.get("text_update_interval")
         text_update_full = raw.get("text_update_full")
+        poll_shard_size = raw.get("poll_shard_size")
+        poll_concurrency = raw.get("poll_concurrency")
+        trigger_batch_size = raw.get("trigger_batch_size")
+        trigger_concurrency = raw.get("trigger_concurrency")
+        adaptive_polling = raw.get("adaptive_polling")
+        poll_interval_min = raw.get("poll_interval_min")
+        poll_interval_max = raw.get("poll_interval_max")
+        run_timeout = raw.get("run_timeout")
+        host_timeout = raw.get("host_timeout")
+        progress_timeout = raw.get("progress_timeout")
+        output_memory_limit = raw.get("output_memory_limit")
+        text_update_delta = raw.get("text_update_delta")
+        text_update_checkpoint = raw.get("text_update_checkpoint")
+        host_console_limit = raw.get("host_console_limit")
+        run_console_limit = raw.get("run_console_limit")
 
         validated = {}
         validated["text_updates"] = validate(
@@ -54,4 +141,110 @@ class Config:
             f"Expected the value of text_update_interval '{text_update_interval}' to be an integer greater or equal than 5000",
             logger,
         )
+        validated["poll_shard_size"] = validate(
+            lambda val: type(val) == int and val >= 1,
+            poll_shard_size,
+            Config.Defaults.POLL_SHARD_SIZE,
+            f"Expected the value of poll_shard_size '{poll_shard_size}' to be a positive integer",
+            logger,
+        )
+        validated["poll_concurrency"] = validate(
+            lambda val: type(val) == int and val >= 1,
+            poll_concurrency,
+            Config.Defaults.POLL_CONCURRENCY,
+            f"Expected the value of poll_concurrency '{poll_concurrency}' to be a positive integer",
+            logger,
+        )
+        validated["trigger_batch_size"] = validate(
+            lambda val: type(val) == int and val >= 0,
+            trigger_batch_size,
+            Config.Defaults.TRIGGER_BATCH_SIZE,
+            f"Expected the value of trigger_batch_size '{trigger_batch_size}' to be a non-negative integer",
+            logger,
+        )
+        validated["trigger_concurrency"] = validate(
+            lambda val: type(val) == int and val >= 1,
+            trigger_concurrency,
+            Config.Defaults.TRIGGER_CONCURRENCY,
+            f"Expected the value of trigger_concurrency '{trigger_concurrency}' to be a positive integer",
+            logger,
+        )
+        validated["adaptive_polling"] = validate(
+            lambda val: type(val) == bool,
+            adaptive_polling,
+            Config.Defaults.ADAPTIVE_POLLING,
+            f"Expected the value of adaptive_polling '{adaptive_polling}' to be a boolean",
+            logger,
+        )
+        validated["poll_interval_min"] = validate(
+            lambda val: type(val) == int and val >= 1000,
+            poll_interval_min,
+            Config.Defaults.POLL_INTERVAL_MIN,
+            f"Expected the value of poll_interval_min '{poll_interval_min}' to be an integer greater or equal than 1000",
+            logger,
+        )
+        minimum = validated["poll_interval_min"]
+        validated["poll_interval_max"] = validate(
+            lambda val: type(val) == int and val >= minimum,
+            poll_interval_max,
+            max(Config.Defaults.POLL_INTERVAL_MAX, minimum),
+            f"Expected the value of poll_interval_max '{poll_interval_max}' to be an integer greater or equal than poll_interval_min",
+            logger,
+        )
+        validated["run_timeout"] = validate(
+            lambda val: type(val) == int and val >= 0,
+            run_timeout,
+            Config.Defaults.RUN_TIMEOUT,
+            f"Expected the value of run_timeout '{run_timeout}' to be a non-negative integer",
+            logger,
+        )
+        validated["host_timeout"] = validate(
+            lambda val: type(val) == int and val >= 0,
+            host_timeout,
+            Config.Defaults.HOST_TIMEOUT,
+            f"Expected the value of host_timeout '{host_timeout}' to be a non-negative integer",
+            logger,
+        )
+        validated["progress_timeout"] = validate(
+            lambda val: type(val) == int and val >= 0,
+            progress_timeout,
+            Config.Defaults.PROGRESS_TIMEOUT,
+            f"Expected the value of progress_timeout '{progress_timeout}' to be a non-negative integer",
+            logger,
+        )
+        validated["output_memory_limit"] = validate(
+            lambda val: type(val) == int and val >= 0,
+            output_memory_limit,
+            Config.Defaults.OUTPUT_MEMORY_LIMIT,
+            f"Expected the value of output_memory_limit '{output_memory_limit}' to be a non-negative integer",
+            logger,
+        )
+        validated["text_update_delta"] = validate(
+            lambda val: type(val) == bool,
+            text_update_delta,
+            Config.Defaults.TEXT_UPDATE_DELTA,
+            f"Expected the value of text_update_delta '{text_update_delta}' to be a boolean",
+            logger,
+        )
+        validated["text_update_checkpoint"] = validate(
+            lambda val: type(val) == int and val >= 1,
+            text_update_checkpoint,
+            Config.Defaults.TEXT_UPDATE_CHECKPOINT,
+            f"Expected the value of text_update_checkpoint '{text_update_checkpoint}' to be a positive integer",
+            logger,
+        )
+        validated["host_console_limit"] = validate(
+            lambda val: type(val) == int and val >= 0,
+            host_console_limit,
+            Config.Defaults.HOST_CONSOLE_LIMIT,
+            f"Expected the value of host_console_limit '{host_console_limit}' to be a non-negative integer",
+            logger,
+        )
+        validated["run_console_limit"] = validate(
+            lambda val: type(val) == int and val >= 0,
+            run_console_limit,
+            Config.Defaults.RUN_CONSOLE_LIMIT,
+            f"Expected the value of run_console_limit '{run_console_limit}' to be a non-negative integer",
+            logger,
+        )
         return validated
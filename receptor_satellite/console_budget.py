@@ -0,0 +1,26 @@
+# Bytes of console output hosts of a run may send, 0 means no limit
+class ConsoleBudget:
+    class Defaults:
+        # Past the run limit every host still gets this much, enough for the
+        # end of its console with the recap and exit status
+        MIN_CAP = 4096
+
+    def __init__(self, run_limit=0, host_limit=0, min_cap=Defaults.MIN_CAP):
+        self.run_limit = run_limit
+        self.host_limit = host_limit
+        self.min_cap = min_cap
+        self.size = 0
+
+    # Returns how many bytes of its console a host may send once its console
+    # grew from before to after bytes, None if there is no limit
+    def grow(self, cap, before, after):
+        self.size += after - before
+        if self.host_limit and after > self.host_limit:
+            cap = self.__lower(cap, self.host_limit)
+        # Once the whole run went over, hosts keep what they had so far
+        if self.run_limit and self.size > self.run_limit:
+            cap = self.__lower(cap, max(before, self.min_cap))
+        return cap
+
+    def __lower(self, cap, limit):
+        return limit if cap is None else min(cap, limit)
@@ -0,0 +1,76 @@
+import asyncio
+import atexit
+import threading
+
+from .satellite_api import session_pool
+
+
+# asyncio.all_tasks and asyncio.current_task only exist since Python 3.7
+def all_tasks(loop):
+    if hasattr(asyncio, "all_tasks"):
+        return asyncio.all_tasks(loop)
+    return asyncio.Task.all_tasks(loop)
+
+
+def current_task(loop):
+    if hasattr(asyncio, "current_task"):
+        return asyncio.current_task(loop)
+    return asyncio.Task.current_task(loop)
+
+
+class ResidentLoop:
+    class Defaults:
+        SHUTDOWN_TIMEOUT = 10  # seconds
+
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.__lock = threading.Lock()
+
+    def start(self):
+        with self.__lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self.thread = threading.Thread(
+                    target=self.__run_forever,
+                    args=(self.loop,),
+                    name="receptor-satellite-loop",
+                    daemon=True,
+                )
+                self.thread.start()
+            return self.loop
+
+    def run(self, coroutine):
+        loop = self.start()
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    def shutdown(self, timeout=Defaults.SHUTDOWN_TIMEOUT):
+        with self.__lock:
+            loop, thread = self.loop, self.thread
+            self.loop = self.thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.__cleanup(), loop).result(timeout)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            if not thread.is_alive():
+                loop.close()
+
+    def __run_forever(self, loop):
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    async def __cleanup(self):
+        loop = asyncio.get_event_loop()
+        this = current_task(loop)
+        pending = [task for task in all_tasks(loop) if task is not this]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        await session_pool.close_all()
+
+
+resident_loop = ResidentLoop()
+atexit.register(resident_loop.shutdown)
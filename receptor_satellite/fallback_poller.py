@@ -0,0 +1,119 @@
+import asyncio
+
+
+class TimerWheel:
+    def __init__(self, size, tick):
+        self.tick = tick
+        self.position = 0
+        self.__slots = [[] for _ in range(size)]
+        self.__count = 0
+
+    def __len__(self):
+        return self.__count
+
+    def schedule(self, item, delay):
+        ticks = max(1, round(delay / self.tick))
+        size = len(self.__slots)
+        # Items due further away than one turn of the wheel wait for as many
+        # rounds before they are due
+        rounds = (ticks - 1) // size
+        self.__slots[(self.position + ticks) % size].append((rounds, item))
+        self.__count += 1
+
+    # Moves to the next slot and returns the items which became due
+    def advance(self):
+        self.position = (self.position + 1) % len(self.__slots)
+        due, waiting = [], []
+        for rounds, item in self.__slots[self.position]:
+            if rounds:
+                waiting.append((rounds - 1, item))
+            else:
+                due.append(item)
+        self.__slots[self.position] = waiting
+        self.__count -= len(due)
+        return due
+
+    def drain(self):
+        items = [item for slot in self.__slots for _rounds, item in slot]
+        self.__slots = [[] for _ in self.__slots]
+        self.__count = 0
+        return items
+
+
+# Polls hosts one by one for Satellites without the batch outputs endpoint
+class FallbackPoller:
+    class Defaults:
+        SLOTS = 64
+
+    def __init__(self, run, concurrency, slots=Defaults.SLOTS):
+        self.run = run
+        self.interval = run.config.text_update_interval
+        self.wheel = TimerWheel(slots, self.interval / slots)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.failures = {}
+        self.intervals = {}
+        self.task = None
+        self.__in_flight = set()
+
+    def add(self, hosts):
+        # Spread the first polls over the interval, later ones keep the offset
+        for i, host in enumerate(hosts):
+            self.wheel.schedule(host, (i + 1) * self.interval / len(hosts))
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.__run())
+
+    async def wait(self):
+        if self.task is not None:
+            await self.task
+
+    def stop(self):
+        self.wheel.drain()
+
+    async def __run(self):
+        while len(self.wheel) or self.__in_flight:
+            if len(self.wheel):
+                await self.run.sleep(self.wheel.tick)
+                # Everybody gets a last poll right after cancelling
+                if self.run.cancelled:
+                    due = self.wheel.drain()
+                else:
+                    due = self.wheel.advance()
+                for host in due:
+                    self.__in_flight.add(asyncio.ensure_future(self.poll(host)))
+            else:
+                await asyncio.wait(
+                    self.__in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+            for future in [future for future in self.__in_flight if future.done()]:
+                self.__in_flight.remove(future)
+                future.result()
+
+    async def poll(self, host):
+        async with self.semaphore:
+            interval = self.intervals.get(host.id)
+            if interval is None:
+                interval = self.intervals[host.id] = self.run.poll_interval()
+            response = await host.poll(interval)
+        if host.result is None:
+            self.run.expire([host])
+        if host.result is None:
+            if response["error"] is None:
+                self.failures.pop(host.id, None)
+                self.wheel.schedule(host, interval.current)
+            else:
+                self.retry(host, response["error"])
+        if host.result is not None:
+            # Finished hosts drop out of the schedule
+            self.failures.pop(host.id, None)
+            self.intervals.pop(host.id, None)
+            self.run.running.pop(host.id, None)
+
+    def retry(self, host, error):
+        failures = self.failures.get(host.id, 0) + 1
+        self.failures[host.id] = failures
+        if self.run.cancelled:
+            host.done()
+        elif failures >= self.run.retry_policy.attempts:
+            host.mark_as_failed(error)
+        else:
+            self.wheel.schedule(host, self.run.retry_policy.delay(failures))
@@ -1,67 +1,223 @@
-import asyncio
-import re
+from collections import Counter
 
+from receptor_satellite import retry_policy
+from receptor_satellite.output_buffer import OutputBuffer
+from receptor_satellite.output_scanner import EXCEPTION, OutputScanner
 from receptor_satellite.response.response_queue import constants
 
-# EXCEPTION means failure between capsule and the target host
-EXIT_STATUS_RE = re.compile(r"Exit status: (([0-9]+)|EXCEPTION)", re.MULTILINE)
-UNREACHABLE_RE = re.compile(r"unreachable=[1-9][0-9]*")
+
+def chunk_fingerprint(chunk):
+    return hash((chunk.get("output_type"), chunk["output"]))
 
 
 class Host:
+    # Runs may have tens of thousands of hosts
+    __slots__ = (
+        "run",
+        "id",
+        "name",
+        "job_invocation_id",
+        "sequence",
+        "since",
+        "since_seen",
+        "sent_since",
+        "chunk_count",
+        "started_at",
+        "progress_at",
+        "result",
+        "scanner",
+        "last_chunk",
+        "output",
+        "sent_size",
+        "cap",
+        "unreachable",
+    )
+
     def __init__(self, run, id, name):
         self.run = run
         self.id = id
         self.name = name
+        self.job_invocation_id = None
         self.sequence = 0
         self.since = None if run.config.text_update_full else 0.0
+        self.since_seen = None if self.since is None else Counter()
+        # Cursor of the output already sent, where polling resumes from
+        self.sent_since = self.since
+        self.chunk_count = 0
+        self.started_at = self.progress_at = run.clock()
         self.result = None
-        self.last_recap_line = ""
-        self.host_recap_re = re.compile(f"^.*{name}.*ok=[0-9]+")
-        self.last_output = ""
+        self.scanner = OutputScanner(name)
+        self.last_chunk = None
+        # The whole output in full mode, otherwise only what was not sent yet
+        self.output = OutputBuffer(run.config.output_memory_limit)
+        # Bytes of the console sent, None before the first update
+        self.sent_size = None
+        # Bytes of the console consumers get, None if there is no limit
+        self.cap = None
         self.unreachable = None
 
-    def mark_as_failed(self, message, connection_result=True):
+    def mark_as_failed(
+        self, message, connection_result=True, result=constants.RESULT_FAILURE
+    ):
         queue = self.run.queue
         playbook_run_id = self.run.playbook_run_id
         queue.playbook_run_update(self.name, playbook_run_id, message, self.sequence)
         queue.playbook_run_finished(
-            self.name, playbook_run_id, constants.RESULT_FAILURE, connection_result
+            self.name, playbook_run_id, result, connection_result
         )
+        self.finish(result)
 
+    # Returns whether there was anything new
     def process_outputs(self, outputs):
-        if outputs["output"] and (self.run.config.text_updates or outputs["complete"]):
-            self.last_output = "".join(chunk["output"] for chunk in outputs["output"])
-            if self.since is not None:
-                self.since = outputs["output"][-1]["timestamp"]
-            self.run.queue.playbook_run_update(
-                self.name, self.run.playbook_run_id, self.last_output, self.sequence
-            )
-            self.sequence += 1
+        size = self.console_size
+        chunks = self.new_chunks(outputs["output"])
+        if self.since is None:
+            # Every poll returns the whole output, only scan what was added
+            active = len(chunks) != self.chunk_count
+            if self.rewritten(chunks):
+                self.scanner = OutputScanner(self.name)
+                self.output.clear()
+                self.chunk_count = 0
+                self.sent_size = None
+            fresh = chunks[self.chunk_count :]
+            self.chunk_count = len(chunks)
+            self.last_chunk = chunks[-1] if chunks else None
+        else:
+            fresh = chunks
+            active = bool(chunks)
+        if active:
+            self.progress_at = self.run.clock()
+        for chunk in fresh:
+            self.scanner.feed(chunk["output"])
+            self.output.append(chunk["output"])
+        self.cap = self.run.console_budget.grow(self.cap, size, self.console_size)
+        # Once cancelled, every poll may be the last one
+        final = outputs["complete"] or self.run.cancelled
+        config = self.run.config
+        if self.output and (config.text_updates or final):
+            if self.truncated:
+                self.send_truncated(final)
+            elif self.since is not None:
+                self.send_pending()
+            elif config.text_update_delta:
+                self.send_delta()
+            else:
+                self.send_update(self.output.read())
+        return active or outputs["complete"]
 
-        self.find_recap_line()
+    @property
+    def console_size(self):
+        if self.since is None:
+            return len(self.output)
+        return (self.sent_size or 0) + len(self.output)
 
-    def find_recap_line(self):
-        possible_recaps = list(
-            filter(
-                lambda x: re.match(self.host_recap_re, x), self.last_output.split("\n")
-            )
+    @property
+    def truncated(self):
+        return self.cap is not None and self.console_size > self.cap
+
+    def send_update(self, output, console_offset=None, checkpoint=False):
+        self.run.queue.playbook_run_update(
+            self.name,
+            self.run.playbook_run_id,
+            output,
+            self.sequence,
+            console_offset,
+            checkpoint,
         )
-        if len(possible_recaps) > 0:
-            self.last_recap_line = possible_recaps.pop()
+        self.sequence += 1
+        self.sent_since = self.since
+
+    def send_pending(self):
+        self.send_update(self.output.read())
+        self.sent_size = self.console_size
+        self.output.clear()
+
+    # Sends only the output consumers have not seen yet, or all of it when a
+    # checkpoint is due so they can resync
+    def send_delta(self):
+        size = len(self.output)
+        if self.sent_size == size:
+            return
+        if self.checkpoint_due(size):
+            self.send_update(self.output.read(), 0, True)
+        else:
+            self.send_update(self.output.read(self.sent_size), self.sent_size)
+        self.sent_size = size
+
+    # Past its cap, consumers get the start and the end of the console with
+    # a marker in between, recap and exit status are still scanned in full
+    def send_truncated(self, final):
+        head = self.cap // 2
+        tail = self.cap - head
+        if self.since is None:
+            if self.sent_size == len(self.output):
+                return
+            output = self.output.read_elided(head, tail)
+            if self.run.config.text_update_delta:
+                self.send_update(output, 0, True)
+            else:
+                self.send_update(output)
+            self.sent_size = len(self.output)
+        elif final:
+            # What was sent can't be taken back, so the tail only follows
+            # whatever is left of the head
+            head = max(0, head - (self.sent_size or 0))
+            self.send_update(self.output.read_elided(head, tail))
+            self.output.clear()
+
+    def checkpoint_due(self, size):
+        if self.sent_size is None or self.sent_size > size:
+            return True
+        return self.sequence % self.run.config.text_update_checkpoint == 0
+
+    # Output is expected to only grow, start over if what was scanned changed
+    def rewritten(self, chunks):
+        if len(chunks) < self.chunk_count:
+            return True
+        return self.chunk_count > 0 and chunks[self.chunk_count - 1] != self.last_chunk
+
+    def new_chunks(self, chunks):
+        if self.since is None:
+            return chunks
+        # Chunks sharing the cursor's timestamp may be sent again, skip as many
+        # of each as were already seen
+        seen = self.since_seen.copy()
+        fresh = []
+        for chunk in chunks:
+            timestamp = chunk["timestamp"]
+            if timestamp == self.since:
+                fingerprint = chunk_fingerprint(chunk)
+                if seen[fingerprint] > 0:
+                    seen[fingerprint] -= 1
+                    continue
+            elif timestamp < self.since:
+                continue
+            fresh.append(chunk)
+
+        if fresh:
+            latest = max(chunk["timestamp"] for chunk in fresh)
+            if latest > self.since:
+                self.since = latest
+                self.since_seen = Counter()
+            self.since_seen.update(
+                chunk_fingerprint(chunk)
+                for chunk in fresh
+                if chunk["timestamp"] == latest
+            )
+        return fresh
 
     def done(self):
+        self.scanner.finish()
         connection_result = True
-        connection_error = re.search(UNREACHABLE_RE, self.last_recap_line)
+        connection_error = self.scanner.unreachable
         result = constants.HOST_RESULT_FAILURE
-        matches = re.findall(EXIT_STATUS_RE, self.last_output)
+        exit_status = self.scanner.exit_status
         exit_code = None
         # This means the job was already running on the host
-        if matches:
-            code = matches[0][1]
+        if exit_status is not None:
             # If there was an exit code
-            if code != "":
-                exit_code = int(code)
+            if exit_status != EXCEPTION:
+                exit_code = exit_status
                 if exit_code == 0:
                     result = constants.HOST_RESULT_SUCCESS
                 elif self.run.cancelled:
@@ -84,31 +240,29 @@ class Host:
             connection_result,
             exit_code,
         )
+        self.finish(result)
+
+    def finish(self, result):
         self.result = result
+        # Nothing is sent for this host anymore
+        self.output.clear()
+        self.run.journal.done(self.run, [self])
 
-    async def polling_loop(self):
-        if self.id is None:
-            return self.mark_as_failed("This host is not known by Satellite")
-        while True:
-            response = await self.poll_with_retries()
-            if response["error"]:
-                break
+    # Polls once, failures are handled by whoever schedules the polls
+    async def poll(self, interval=None):
+        satellite_api = self.run.satellite_api
+        response = await retry_policy.guarded(
+            satellite_api.circuit_breaker,
+            lambda: satellite_api.output(self.job_invocation_id, self.id, self.since),
+        )
+        if response["error"] is None:
             body = response["body"]
-            self.process_outputs(body)
-
-            if body["complete"]:
+            sequence = self.sequence
+            active = self.process_outputs(body)
+            if interval is not None:
+                interval.update(active)
+            if body["complete"] or self.run.cancelled:
                 self.done()
-                break
-
-    async def poll_with_retries(self):
-        retry = 0
-        while retry < 5:
-            await asyncio.sleep(self.run.config.text_update_interval)
-            response = await self.run.satellite_api.output(
-                self.run.job_invocation_id, self.id, self.since
-            )
-            if response["error"] is None:
-                return response
-            retry += 1
-        self.mark_as_failed(response["error"])
-        return dict(error=True)
+            elif self.sequence != sequence:
+                self.run.journal.progress(self.run, [self])
+        return response
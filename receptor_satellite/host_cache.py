@@ -0,0 +1,123 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .journal import running_loop
+
+MISSING = "missing"
+
+
+class HostCache:
+    class Defaults:
+        TTL = 3600  # seconds
+        MISSING_TTL = 300  # seconds
+        MAX_SIZE = 100000
+
+    def __init__(
+        self,
+        url=None,
+        path=None,
+        ttl=Defaults.TTL,
+        missing_ttl=Defaults.MISSING_TTL,
+        max_size=Defaults.MAX_SIZE,
+        clock=time.time,
+    ):
+        self.url = url
+        self.path = path
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        self.max_size = max_size
+        self.clock = clock
+        self.__entries = OrderedDict()
+        # Whether there is anything the file does not have yet
+        self.__dirty = False
+        self.__snapshot = None
+        self.__lock = threading.Lock()
+        if path:
+            self.load()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    # Returns the host's ID, MISSING if Satellite recently did not know the
+    # host or None if there is nothing fresh in the cache
+    def get(self, name):
+        entry = self.__entries.get(name)
+        if entry is None:
+            return None
+        host_id, expires_at = entry
+        if expires_at <= self.clock():
+            del self.__entries[name]
+            return None
+        self.__entries.move_to_end(name)
+        return MISSING if host_id is None else host_id
+
+    def remember(self, name, host_id):
+        self.__store(name, host_id, self.ttl)
+
+    def remember_missing(self, name):
+        self.__store(name, None, self.missing_ttl)
+
+    def forget(self, name):
+        if self.__entries.pop(name, None) is not None:
+            self.__dirty = True
+
+    def __store(self, name, host_id, ttl):
+        self.__entries[name] = (host_id, self.clock() + ttl)
+        self.__dirty = True
+        self.__entries.move_to_end(name)
+        while len(self.__entries) > self.max_size:
+            self.__entries.popitem(last=False)
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("url") != self.url:
+            return
+        now = self.clock()
+        for name, (host_id, expires_at) in data.get("hosts", {}).items():
+            if expires_at > now:
+                self.__entries[name] = (host_id, expires_at)
+
+    # Serializing a large cache would block the loop, so the file is written
+    # in an executor. Returns the pending write, if any
+    def save(self):
+        if not self.path or not self.__dirty:
+            return None
+        self.__dirty = False
+        self.__snapshot = dict(url=self.url, hosts=OrderedDict(self.__entries))
+        loop = running_loop()
+        if loop is None:
+            self.write()
+            return None
+        return loop.run_in_executor(None, self.write)
+
+    # Writes may finish out of order, each one writes the newest snapshot
+    # and the ones after it find nothing left to do
+    def write(self):
+        with self.__lock:
+            data, self.__snapshot = self.__snapshot, None
+            if data is None:
+                return
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, "w") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                self.__dirty = True
+
+
+host_caches = {}
+
+
+def host_cache(url, path=None, ttl=HostCache.Defaults.TTL):
+    key = (url, path)
+    if key not in host_caches:
+        host_caches[key] = HostCache(url, path, ttl)
+    return host_caches[key]
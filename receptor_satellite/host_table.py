@@ -0,0 +1,26 @@
+# The hosts of a run in the order they were requested, indexed by name
+class HostTable:
+    __slots__ = ("__hosts", "__by_name")
+
+    def __init__(self, hosts=()):
+        self.__hosts = []
+        self.__by_name = {}
+        for host in hosts:
+            self.add(host)
+
+    def add(self, host):
+        self.__hosts.append(host)
+        # With duplicate names, the last host wins like Satellite's answers do
+        self.__by_name[host.name] = host
+
+    def named(self, name):
+        return self.__by_name.get(name)
+
+    def __getitem__(self, index):
+        return self.__hosts[index]
+
+    def __iter__(self):
+        return iter(self.__hosts)
+
+    def __len__(self):
+        return len(self.__hosts)
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import os
+import time
+
+TRIGGER = "trigger"
+PROGRESS = "progress"
+DONE = "done"
+FINISH = "finish"
+SNAPSHOT = "snapshot"
+
+
+class Journal:
+    class Defaults:
+        MAX_AGE = 86400  # seconds
+        COMPACT_AFTER = 10000  # records
+
+    def __init__(
+        self,
+        path=None,
+        max_age=Defaults.MAX_AGE,
+        clock=time.time,
+        compact_after=Defaults.COMPACT_AFTER,
+    ):
+        self.path = path
+        self.max_age = max_age
+        self.clock = clock
+        self.compact_after = compact_after
+        self.__resumable = {}
+        # State of the unfinished runs, what a compacted journal contains
+        self.__runs = {}
+        self.__pending = []
+        self.__written = 0
+        self.__file = None
+        if path:
+            self.load()
+
+    # Returns the state of an unfinished run from the journal, only once
+    def resumable(self, playbook_run_id):
+        return self.__resumable.pop(playbook_run_id, None)
+
+    def triggered(self, run, job_invocation_id, hosts):
+        self.__append(
+            run,
+            TRIGGER,
+            job_invocation_id=job_invocation_id,
+            hosts=[[host.name, host.id, host.sent_since] for host in hosts],
+        )
+
+    def progress(self, run, hosts):
+        if hosts:
+            self.__append(
+                run,
+                PROGRESS,
+                hosts=[[host.name, host.sequence, host.sent_since] for host in hosts],
+            )
+
+    def done(self, run, hosts):
+        self.__append(
+            run,
+            DONE,
+            hosts=[[host.name, host.result, host.unreachable] for host in hosts],
+        )
+
+    def finished(self, run):
+        self.__append(run, FINISH)
+
+    def __append(self, run, event, **data):
+        if not self.path:
+            return
+        record = dict(run=run.playbook_run_id, event=event, time=self.clock(), **data)
+        replay(self.__runs, record)
+        self.__pending.append(json.dumps(record) + "\n")
+        if len(self.__pending) > 1:
+            return
+        # Records from the same loop iteration are written together
+        loop = running_loop()
+        if loop is None:
+            self.flush()
+        else:
+            loop.call_soon(self.flush)
+
+    def flush(self):
+        if not self.__pending:
+            return
+        if self.__file is None:
+            self.__file = open(self.path, "a")
+        # Flushing is enough to survive the process restarting, the journal
+        # is not meant to survive the machine going down
+        self.__file.writelines(self.__pending)
+        self.__file.flush()
+        self.__written += len(self.__pending)
+        self.__pending = []
+        # Nothing left to resume or too much history, start over
+        if not self.__runs or self.__written >= self.compact_after:
+            self.compact()
+
+    def load(self):
+        runs = {}
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        replay(runs, json.loads(line))
+                    except (ValueError, KeyError, TypeError):
+                        # The last line may be incomplete if we died writing it
+                        continue
+        except OSError:
+            return
+        self.__runs = {
+            playbook_run_id: state
+            for playbook_run_id, state in runs.items()
+            if state["running"]
+        }
+        self.compact()
+        self.__resumable = dict(self.__runs)
+
+    # Rewrites the journal to contain only a snapshot of each unfinished run
+    def compact(self):
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+        deadline = self.clock() - self.max_age
+        self.__runs = {
+            playbook_run_id: state
+            for playbook_run_id, state in self.__runs.items()
+            if state["time"] > deadline
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            for playbook_run_id, state in self.__runs.items():
+                record = dict(
+                    run=playbook_run_id, event=SNAPSHOT, time=state["time"], state=state
+                )
+                f.write(json.dumps(record) + "\n")
+        os.replace(tmp_path, self.path)
+        self.__written = len(self.__runs)
+
+
+def running_loop():
+    try:
+        loop = asyncio.get_event_loop()
+    except RuntimeError:
+        return None
+    return loop if loop.is_running() else None
+
+
+# State of a run is
+#   running: name -> [host ID, job invocation ID, sequence, since]
+#   done: name -> [result, unreachable]
+def replay(runs, record):
+    playbook_run_id = record["run"]
+    event = record["event"]
+    if event == SNAPSHOT:
+        runs[playbook_run_id] = record["state"]
+    elif event == FINISH:
+        runs.pop(playbook_run_id, None)
+        return
+    state = runs.setdefault(playbook_run_id, dict(running={}, done={}))
+    state["time"] = record["time"]
+    if event == TRIGGER:
+        for name, host_id, since in record["hosts"]:
+            state["running"][name] = [host_id, record["job_invocation_id"], 0, since]
+    elif event == PROGRESS:
+        for name, sequence, since in record["hosts"]:
+            if name in state["running"]:
+                state["running"][name][2:] = [sequence, since]
+    elif event == DONE:
+        for name, result, unreachable in record["hosts"]:
+            state["running"].pop(name, None)
+            state["done"][name] = [result, unreachable]
+
+
+journals = {}
+
+
+def journal(path=None):
+    if path not in journals:
+        journals[path] = Journal(path)
+    return journals[path]
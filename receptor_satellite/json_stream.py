@@ -0,0 +1,88 @@
+import json
+import re
+
+# Outside of strings only brackets and quotes change the structure, inside of
+# them only quotes and backslashes matter, everything else is skipped over
+STRUCTURAL_RE = re.compile(rb'["\\{}\[\]]')
+MAX_KEY_LENGTH = 256
+
+
+class ArrayItemDecoder:
+    # Incrementally decodes the items of the array stored under key in a top
+    # level JSON object, only holding the bytes of the item currently being
+    # read in memory
+    def __init__(self, key):
+        self.key = key.encode("utf-8")
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.string = None
+        self.last_string = None
+        self.array_depth = None
+        self.item = None
+
+    def feed(self, chunk):
+        items = []
+        skip = -1
+        if self.escaped:
+            self.escaped = False
+            skip = 0
+        item_start = 0 if self.item is not None else None
+        string_start = 0 if self.string is not None else None
+
+        for match in STRUCTURAL_RE.finditer(chunk):
+            pos = match.start()
+            if pos == skip:
+                continue
+            char = chunk[pos : pos + 1]
+            if self.in_string:
+                if char == b"\\":
+                    skip = pos + 1
+                    if skip == len(chunk):
+                        self.escaped = True
+                elif char == b'"':
+                    self.in_string = False
+                    if self.string is not None:
+                        self.string += chunk[string_start:pos]
+                        self.last_string = bytes(self.string)
+                        self.string = None
+                        string_start = None
+            elif char == b'"':
+                self.in_string = True
+                if self.depth == 1:
+                    self.last_string = None
+                    self.string = bytearray()
+                    string_start = pos + 1
+            elif char in (b"{", b"["):
+                self.depth += 1
+                if self.array_depth is None:
+                    if self.depth == 2 and self.last_string == self.key:
+                        if char == b"[":
+                            self.array_depth = self.depth
+                elif self.item is None and self.depth == self.array_depth + 1:
+                    self.item = bytearray()
+                    item_start = pos
+            elif char in (b"}", b"]"):
+                self.depth -= 1
+                if self.array_depth is None:
+                    continue
+                if self.item is not None and self.depth == self.array_depth:
+                    self.item += chunk[item_start : pos + 1]
+                    items.append(json.loads(self.item))
+                    self.item = None
+                    item_start = None
+                elif self.depth < self.array_depth:
+                    self.array_depth = None
+
+        if self.item is not None:
+            self.item += chunk[item_start:]
+        if self.string is not None:
+            self.string += chunk[string_start:]
+            if len(self.string) > MAX_KEY_LENGTH:
+                # Too long to be the key we are looking for
+                self.string = None
+        return items
+
+    def close(self):
+        if self.depth != 0 or self.in_string:
+            raise ValueError("Unexpected end of JSON document")
@@ -0,0 +1,26 @@
+from collections import Counter
+
+HOSTS_RUN_TIMEOUT = "hosts_run_timeout"
+HOSTS_TIMED_OUT = "hosts_timed_out"
+HOSTS_STALLED = "hosts_stalled"
+RUNS_TIMED_OUT = "runs_timed_out"
+
+
+class Metrics:
+    def __init__(self):
+        self.__counters = Counter()
+
+    def increment(self, name, value=1):
+        self.__counters[name] += value
+
+    def get(self, name):
+        return self.__counters[name]
+
+    def snapshot(self):
+        return dict(self.__counters)
+
+    def clear(self):
+        self.__counters = Counter()
+
+
+metrics = Metrics()
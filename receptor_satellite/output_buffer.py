@@ -0,0 +1,70 @@
+import mmap
+import tempfile
+
+ELIDED = "\n[... {} bytes elided ...]\n"
+
+
+# Collects console output as a list of encoded chunks, once it grows past
+# the memory limit everything is moved to a temporary file
+class OutputBuffer:
+    __slots__ = ("memory_limit", "size", "__chunks", "__file")
+
+    def __init__(self, memory_limit):
+        self.memory_limit = memory_limit
+        self.size = 0
+        self.__chunks = []
+        self.__file = None
+
+    @property
+    def spilled(self):
+        return self.__file is not None
+
+    def append(self, text):
+        if not text:
+            return
+        data = text.encode("utf-8")
+        self.size += len(data)
+        if self.__file is None and self.size > self.memory_limit:
+            self.__file = tempfile.TemporaryFile()
+            self.__file.writelines(self.__chunks)
+            self.__chunks = []
+        if self.__file is None:
+            self.__chunks.append(data)
+        else:
+            self.__file.write(data)
+
+    # Reads the output between the given byte offsets, characters cut in half
+    # at either end are dropped
+    def read(self, start=0, end=None):
+        end = self.size if end is None else end
+        if self.__file is None:
+            data = b"".join(self.__slice(start, end))
+            return data.decode("utf-8", "ignore")
+        self.__file.flush()
+        with mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return str(data[start:end], "utf-8", "ignore")
+
+    # Keeps head bytes from the start and tail bytes from the end, with a
+    # marker saying how much was left out in between
+    def read_elided(self, head, tail):
+        if self.size <= head + tail:
+            return self.read()
+        elided = ELIDED.format(self.size - head - tail)
+        return self.read(0, head) + elided + self.read(self.size - tail)
+
+    def __slice(self, start, end):
+        position = 0
+        for chunk in self.__chunks:
+            if position < end and position + len(chunk) > start:
+                yield chunk[max(0, start - position) : end - position]
+            position += len(chunk)
+
+    def clear(self):
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+        self.__chunks = []
+        self.size = 0
+
+    def __len__(self):
+        return self.size
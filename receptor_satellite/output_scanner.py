@@ -0,0 +1,65 @@
+import re
+
+# EXCEPTION means failure between capsule and the target host
+EXCEPTION = "EXCEPTION"
+EXIT_STATUS_RE = re.compile(r"Exit status: ([0-9]+|EXCEPTION)")
+UNREACHABLE_RE = re.compile(r"unreachable=[1-9][0-9]*")
+DIGITS = "0123456789"
+
+
+# Looks for the host's recap line and the exit status in the console output as
+# it arrives, so every character is only scanned once
+class OutputScanner:
+    __slots__ = ("hostname", "max_tail", "tail", "recap_line", "exit_status")
+
+    class Defaults:
+        MAX_TAIL = 64 * 1024
+
+    def __init__(self, hostname, max_tail=Defaults.MAX_TAIL):
+        self.hostname = hostname
+        self.max_tail = max_tail
+        self.tail = ""
+        self.recap_line = ""
+        self.exit_status = None
+
+    @property
+    def unreachable(self):
+        return UNREACHABLE_RE.search(self.recap_line) is not None
+
+    def feed(self, text):
+        if not text:
+            return
+        lines = (self.tail + text).split("\n")
+        # The last line may continue in the next chunk
+        self.tail = lines.pop()
+        for line in lines:
+            self.scan_line(line)
+        if len(self.tail) > self.max_tail:
+            self.tail = self.tail[-self.max_tail :]
+
+    def finish(self):
+        self.scan_line(self.tail)
+        self.tail = ""
+
+    def scan_line(self, line):
+        if "Exit status: " in line:
+            matches = EXIT_STATUS_RE.findall(line)
+            if matches:
+                status = matches[-1]
+                self.exit_status = status if status == EXCEPTION else int(status)
+        if self.is_recap(line):
+            self.recap_line = line
+
+    # A recap line mentions the host, followed by its ok=<count>
+    def is_recap(self, line):
+        start = line.find(self.hostname)
+        if start < 0:
+            return False
+        position = start + len(self.hostname)
+        while True:
+            position = line.find("ok=", position)
+            if position < 0:
+                return False
+            position += 3
+            if position < len(line) and line[position] in DIGITS:
+                return True
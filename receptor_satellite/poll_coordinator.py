@@ -0,0 +1,70 @@
+import asyncio
+import math
+import random
+import time
+
+
+# Doubles while polls see nothing new and halves as output arrives, staying on
+# the same ladder of intervals so ticks can still be shared
+class AdaptiveInterval:
+    def __init__(self, base, minimum, maximum):
+        self.base = base
+        self.minimum = minimum
+        self.maximum = maximum
+        self.level = 0
+
+    @property
+    def current(self):
+        return min(self.maximum, max(self.minimum, self.base * 2**self.level))
+
+    def update(self, active):
+        if active and self.current > self.minimum:
+            self.level -= 1
+        elif not active and self.current < self.maximum:
+            self.level += 1
+
+
+class Tick:
+    def __init__(self):
+        self.members = 0
+        self.finished = 0
+
+
+class PollCoordinator:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.__ticks = {}
+
+    async def wait(self, interval):
+        if interval <= 0:
+            return
+        now = self.clock()
+        # Ticks are aligned to a shared grid, so all runs polling with the same
+        # interval join the same tick no matter when they started
+        start = (math.floor(now / interval) + 1) * interval
+        key = (asyncio.get_event_loop(), interval, start)
+        tick = self.__ticks.setdefault(key, Tick())
+        index = tick.members
+        tick.members += 1
+        try:
+            await asyncio.sleep(start - now)
+            # Nobody joins a tick after it started, spread its polls evenly
+            # over the interval with some jitter inside of each slot
+            offset = (index + random.random()) * interval / tick.members
+            await asyncio.sleep(max(0, start + offset - self.clock()))
+        finally:
+            tick.finished += 1
+            if tick.finished == tick.members:
+                self.__ticks.pop(key, None)
+
+    def __len__(self):
+        return len(self.__ticks)
+
+
+poll_coordinators = {}
+
+
+def poll_coordinator(url):
+    if url not in poll_coordinators:
+        poll_coordinators[url] = PollCoordinator()
+    return poll_coordinators[url]
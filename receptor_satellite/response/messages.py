@@ -58,14 +58,25 @@ def playbook_run_finished(
     }
 
 
-def playbook_run_update(host, playbook_run_id, output, sequence):
-    return {
+def playbook_run_update(
+    host,
+    playbook_run_id,
+    output,
+    sequence,
+    console_offset=None,  # Byte offset of output in the console || null (whole console)
+    checkpoint=False,  # True if output is the whole console in delta mode
+):
+    message = {
         "type": "playbook_run_update",
         "playbook_run_id": playbook_run_id,
         "sequence": sequence,
         "host": host,
         "console": output,
     }
+    if console_offset is not None:
+        message["console_offset"] = console_offset
+        message["checkpoint"] = checkpoint
+    return message
 
 
 def ack(playbook_run_id):
@@ -9,9 +9,19 @@ class ResponseQueue:
     def ack(self, playbook_run_id):
         self.queue.put(messages.ack(playbook_run_id))
 
-    def playbook_run_update(self, host, playbook_run_id, output, sequence):
+    def playbook_run_update(
+        self,
+        host,
+        playbook_run_id,
+        output,
+        sequence,
+        console_offset=None,
+        checkpoint=False,
+    ):
         self.queue.put(
-            messages.playbook_run_update(host, playbook_run_id, output, sequence)
+            messages.playbook_run_update(
+                host, playbook_run_id, output, sequence, console_offset, checkpoint
+            )
         )
 
     def playbook_run_finished(
@@ -0,0 +1,116 @@
+import asyncio
+import random
+import time
+
+
+class RetryPolicy:
+    class Defaults:
+        ATTEMPTS = 5
+        MAX_DELAY = 120  # seconds
+
+    def __init__(
+        self, base_delay, max_delay=Defaults.MAX_DELAY, attempts=Defaults.ATTEMPTS
+    ):
+        self.base_delay = base_delay
+        self.max_delay = max(base_delay, max_delay)
+        self.attempts = attempts
+
+    def delay(self, attempt):
+        # The first attempt keeps the regular polling cadence, retries back off
+        # exponentially with full jitter
+        if attempt == 0:
+            return self.base_delay
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    class Defaults:
+        FAILURE_THRESHOLD = 5
+        RESET_TIMEOUT = 30  # seconds
+
+    def __init__(
+        self,
+        failure_threshold=Defaults.FAILURE_THRESHOLD,
+        reset_timeout=Defaults.RESET_TIMEOUT,
+        clock=time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probe_done = None
+
+    async def wait(self):
+        while True:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN:
+                remaining = self.opened_at + self.reset_timeout - self.clock()
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+                    continue
+                # Let a single request through to probe whether Satellite recovered
+                self.state = self.HALF_OPEN
+                self.probe_done = asyncio.Event()
+                return
+            await self.probe_done.wait()
+
+    def record_success(self):
+        self.failures = 0
+        self.state = self.CLOSED
+        self.__finish_probe()
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = self.clock()
+        self.__finish_probe()
+
+    def abandon(self):
+        # The probe never completed, hand it over to the next waiter
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+        self.__finish_probe()
+
+    def __finish_probe(self):
+        if self.probe_done:
+            self.probe_done.set()
+            self.probe_done = None
+
+
+circuit_breakers = {}
+
+
+def circuit_breaker(url):
+    if url not in circuit_breakers:
+        circuit_breakers[url] = CircuitBreaker()
+    return circuit_breakers[url]
+
+
+def is_failure(response):
+    # Only connection errors and server side errors point to an overloaded or
+    # unavailable Satellite
+    return response["error"] is not None and (
+        response.get("status", -1) == -1 or response.get("status", -1) >= 500
+    )
+
+
+async def guarded(breaker, request):
+    await breaker.wait()
+    try:
+        response = await request()
+    except BaseException:
+        breaker.abandon()
+        raise
+    if is_failure(response):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
@@ -1,10 +1,26 @@
 import asyncio
+import time
 
 from . import playbook_verifier_adapter
+from . import retry_policy
 
 from .config import Config
+from .console_budget import ConsoleBudget
+from .fallback_poller import FallbackPoller
 from .host import Host
+from .host_cache import MISSING
+from .host_table import HostTable
+from .metrics import (
+    metrics,
+    HOSTS_RUN_TIMEOUT,
+    HOSTS_STALLED,
+    HOSTS_TIMED_OUT,
+    RUNS_TIMED_OUT,
+)
+from .poll_coordinator import AdaptiveInterval
 from .run_monitor import run_monitor
+from .shard import split_into_shards
+from .satellite_api import StreamError, missing_route
 from .response.response_queue import constants
 
 
@@ -27,21 +43,33 @@ class Run:
         self.account = account
         self.playbook = playbook
         self.config = Config.from_raw(Config.validate_input(config, logger))
+        self.retry_policy = retry_policy.RetryPolicy(self.config.text_update_interval)
+        self.journal = satellite_api.journal
+        self.console_budget = ConsoleBudget(
+            self.config.run_console_limit, self.config.host_console_limit
+        )
+        self.clock = time.monotonic
+        self.started_at = self.clock()
+        self.timed_out = False
 
-        unsafe_hostnames = [name for name in hosts if "," in name]
-        for name in unsafe_hostnames:
-            logger.warning(f"Hostname '{name}' contains a comma, skipping")
-            Host(self, None, name).mark_as_failed("Hostname contains a comma, skipping")
-
-        self.hosts = [
-            Host(self, None, name) for name in hosts if name not in unsafe_hostnames
-        ]
+        self.hosts = HostTable()
+        for name in hosts:
+            if "," in name:
+                logger.warning(f"Hostname '{name}' contains a comma, skipping")
+                Host(self, None, name).mark_as_failed(
+                    "Hostname contains a comma, skipping"
+                )
+            else:
+                self.hosts.add(Host(self, None, name))
         self.satellite_api = satellite_api
         self.logger = logger
-        self.job_invocation_id = None
+        self.job_invocation_ids = []
         self.cancelled = False
+        self.__cancellation = None
+        self.result = None
         self.running = {}
-        self.since = None if self.config.text_update_full else 0.0
+        self.shards = []
+        self.fallback_poller = None
 
     @classmethod
     def from_raw(cls, queue, raw, satellite_api, logger):
@@ -65,20 +93,25 @@ class Run:
             return
 
         await self.satellite_api.init_session()
+        scheduler = self.satellite_api.scheduler
+        admitted = False
+        interrupted = False
         try:
             self.queue.ack(self.playbook_run_id)
+            await scheduler.admit()
+            admitted = True
+            # Time spent waiting for admission does not count
+            self.started_at = self.clock()
             self.playbook = playbook_verifier_adapter.verify(self.playbook)
-            response = await self.satellite_api.trigger(
-                {"playbook": self.playbook}, [host.name for host in self.hosts]
-            )
-            if response["error"]:
-                self.abort(response["error"])
-            else:
-                self.job_invocation_id = response["body"]["id"]
-                self.logger.info(
-                    f"Playbook run {self.playbook_run_id} running as job invocation {self.job_invocation_id}"
+            state = self.journal.resumable(self.playbook_run_id)
+            hosts = self.resume(state) if state else self.hosts
+            if self.cancelled:
+                # The run was cancelled while it waited to be admitted
+                await asyncio.gather(
+                    *[self.satellite_api.cancel(id) for id in self.job_invocation_ids]
                 )
-                self.update_hosts(response["body"]["targeting"]["hosts"])
+                self.skip(hosts)
+            if self.cancelled or (state and not hosts) or await self.trigger(hosts):
                 if await self.polling_loop():
                     await self.finish()
                 self.logger.info(f"Playbook run {self.playbook_run_id} done")
@@ -88,42 +121,302 @@ class Run:
                 f"Playbook failed signature validation: {err}",
                 error_key="validation_error",
             )
+        except asyncio.CancelledError:
+            # The worker is going away, keep the run in the journal so that it
+            # can be resumed
+            interrupted = True
+            raise
         finally:
+            if not interrupted:
+                self.journal.finished(self)
+            if admitted:
+                scheduler.leave()
             await run_monitor.done(self)
             await self.satellite_api.close_session()
 
+    async def trigger(self, hosts):
+        batch_size = self.config.trigger_batch_size or len(hosts)
+        batches = [
+            hosts[start : start + batch_size]
+            for start in range(0, len(hosts), batch_size)
+        ] or [hosts]
+        semaphore = asyncio.Semaphore(self.config.trigger_concurrency)
+        errors = await asyncio.gather(
+            *[self.trigger_batch(batch, semaphore) for batch in batches]
+        )
+        failed = [
+            (batch, error) for batch, error in zip(batches, errors) if error is not None
+        ]
+        self.satellite_api.host_cache.save()
+        if len(failed) == len(batches) and not self.running:
+            self.abort(failed[0][1])
+            return False
+
+        for batch, error in failed:
+            self.logger.error(
+                f"Playbook run {self.playbook_run_id} failed to trigger {len(batch)} hosts: '{error}'"
+            )
+            for host in batch:
+                host.mark_as_failed(str(error), None)
+        return True
+
+    async def trigger_batch(self, hosts, semaphore):
+        cache = self.satellite_api.host_cache
+        cached = {host.name: cache.get(host.name) for host in hosts}
+        targets = []
+        for host in hosts:
+            if cached[host.name] is MISSING:
+                host.mark_as_failed("This host is not known by Satellite", None)
+            else:
+                targets.append(host)
+        if not targets:
+            return None
+
+        by_name = [host.name for host in targets if cached[host.name] is None]
+        by_id = [cached[host.name] for host in targets if cached[host.name]]
+        async with semaphore:
+            # Batches still waiting for their turn are not started anymore
+            if self.cancelled:
+                self.skip(targets)
+                return None
+            response = await self.satellite_api.trigger(
+                {"playbook": self.playbook}, by_name, host_ids=by_id
+            )
+        if response["error"]:
+            return response["error"]
+
+        job_invocation_id = response["body"]["id"]
+        self.job_invocation_ids.append(job_invocation_id)
+        # The run was cancelled while this batch was being triggered
+        if self.cancelled:
+            await self.satellite_api.cancel(job_invocation_id)
+        self.logger.info(
+            f"Playbook run {self.playbook_run_id} running as job invocation {job_invocation_id}"
+        )
+        targeted = response["body"]["targeting"]["hosts"]
+        targeted_names = set()
+        for host in targeted:
+            targeted_names.add(host["name"])
+            cache.remember(host["name"], host["id"])
+        for name in by_name:
+            if name not in targeted_names:
+                cache.remember_missing(name)
+
+        # Hosts targeted by a cached ID Satellite did not recognize may have
+        # been registered again, look them up by name
+        stale = [
+            host
+            for host in targets
+            if cached[host.name] and host.name not in targeted_names
+        ]
+        for host in stale:
+            cache.forget(host.name)
+        batch = [host for host in targets if host not in stale]
+        self.update_hosts(targeted, job_invocation_id, batch)
+        self.journal.triggered(
+            self, job_invocation_id, [host for host in batch if host.result is None]
+        )
+        if stale:
+            error = await self.trigger_batch(stale, semaphore)
+            if error is not None:
+                for host in stale:
+                    host.mark_as_failed(str(error), None)
+
     async def polling_loop(self):
-        while any(self.running):
-            response = await self.poll_with_retries()
+        # Skip straight to polling hosts one by one if Satellite is known not
+        # to support polling them in batches
+        if self.satellite_api.capabilities.batch_outputs is False:
+            self.fallback().add(list(self.running.values()))
+            await self.fallback_poller.wait()
+            return True
+
+        invocations = {}
+        for host in self.running.values():
+            invocations.setdefault(host.job_invocation_id, []).append(host)
+        self.shards = [
+            shard
+            for job_invocation_id, hosts in invocations.items()
+            for shard in split_into_shards(
+                job_invocation_id, hosts, self.config.poll_shard_size
+            )
+        ]
+        for shard in self.shards:
+            shard.interval = self.poll_interval()
+        semaphore = asyncio.Semaphore(self.config.poll_concurrency)
+        results = await asyncio.gather(
+            *[self.shard_polling_loop(shard, semaphore) for shard in self.shards]
+        )
+        if self.fallback_poller is not None:
+            await self.fallback_poller.wait()
+        return all(results)
+
+    async def shard_polling_loop(self, shard, semaphore):
+        while len(shard):
+            response = await self.poll_with_retries(shard, semaphore)
+            # Satellite does not support polling hosts in batches, hand the
+            # hosts over to the fallback poller
             if response.get("status") == 404:
-                await asyncio.gather(*[host.polling_loop() for host in self.hosts])
+                self.fallback().add(list(shard.hosts.values()))
+                break
+            # The poll right after cancelling is the last one
+            if self.cancelled:
+                for host in list(shard.hosts.values()):
+                    host.done()
+                    self.running.pop(host.id)
+                shard.clear()
                 break
             if response["error"]:
-                return
-            else:
-                for host_output in response["body"]["outputs"]:
-                    host = self.running[host_output["host_id"]]
-                    host.process_outputs(host_output)
-                    if self.since is not None and host.since > self.since:
-                        self.since = host.since
-                    if host_output["complete"]:
-                        host.done()
-                        self.running.pop(host.id)
+                return False
+            for host in self.expire(list(shard.hosts.values())):
+                shard.remove(host.id)
+        self.shards.remove(shard)
         return True
 
-    async def poll_with_retries(self):
+    async def poll_with_retries(self, shard, semaphore):
+        # Regular polls are scheduled by the Satellite's poll coordinator,
+        # retries back off on their own
+        coordinator = self.satellite_api.poll_coordinator
         retry = 0
-        while retry < 5:
-            await asyncio.sleep(self.config.text_update_interval)
-            response = await self.satellite_api.outputs(
-                self.job_invocation_id, list(self.running.keys()), self.since
-            )
-            if response["error"] is None or response.get("status") == 404:
+        while retry < self.retry_policy.attempts:
+            if retry == 0:
+                await self.interruptible(coordinator.wait(shard.interval.current))
+            else:
+                await self.sleep(self.retry_policy.delay(retry))
+            response = await self.poll(shard, semaphore)
+            if response.get("status") == 404 or response["error"] is None:
+                return response
+            if self.cancelled:
                 return response
             retry += 1
         self.abort(response["error"], running=True)
         return dict(error=True)
 
+    async def poll(self, shard, semaphore):
+        if not len(shard):
+            return dict(error=None)
+        async with semaphore:
+            response = await retry_policy.guarded(
+                self.satellite_api.circuit_breaker,
+                lambda: self.satellite_api.outputs(
+                    shard.job_invocation_id,
+                    shard.host_ids,
+                    shard.since,
+                    search_query=shard.search_query,
+                ),
+            )
+            capabilities = self.satellite_api.capabilities
+            if missing_route(response):
+                capabilities.remember_batch_outputs(False)
+            elif response["error"] is None and capabilities.batch_outputs is None:
+                capabilities.remember_batch_outputs(True)
+            if response.get("status") == 404 or response["error"] is not None:
+                return response
+            try:
+                active = await self.process_outputs(shard, response["body"]["outputs"])
+                shard.interval.update(active)
+            except StreamError as e:
+                response["error"] = e
+            return response
+
+    def cancel(self):
+        self.cancelled = True
+        self.cancellation().set()
+
+    # Finishes hosts which were never started because the run was cancelled
+    def skip(self, hosts):
+        for host in hosts:
+            host.mark_as_failed(
+                "Playbook run was cancelled", None, constants.HOST_RESULT_CANCEL
+            )
+
+    # The event is created lazily as it has to belong to the loop the run
+    # runs in
+    def cancellation(self):
+        if self.__cancellation is None:
+            self.__cancellation = asyncio.Event()
+            if self.cancelled:
+                self.__cancellation.set()
+        return self.__cancellation
+
+    async def sleep(self, delay):
+        await self.interruptible(asyncio.sleep(delay))
+
+    # Waits for the coroutine, unless the run gets cancelled first
+    async def interruptible(self, coroutine):
+        if self.cancelled:
+            coroutine.close()
+            return
+        futures = [
+            asyncio.ensure_future(coroutine),
+            asyncio.ensure_future(self.cancellation().wait()),
+        ]
+        try:
+            await asyncio.wait(futures, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for future in futures:
+                future.cancel()
+
+    # Returns whether any of the hosts had new output or finished
+    async def process_outputs(self, shard, outputs):
+        active = False
+        updated = []
+        newest = None
+        try:
+            async for host_output in outputs:
+                host = shard.hosts.get(host_output["host_id"])
+                if host is None:
+                    continue
+                sequence = host.sequence
+                if host.process_outputs(host_output):
+                    active = True
+                if host.since is not None and (newest is None or host.since > newest):
+                    newest = host.since
+                if host_output["complete"]:
+                    host.done()
+                    shard.remove(host.id)
+                    self.running.pop(host.id)
+                elif host.sequence != sequence:
+                    updated.append(host)
+            shard.advance(newest)
+        finally:
+            self.journal.progress(self, updated)
+        return active
+
+    def fallback(self):
+        if self.fallback_poller is None:
+            self.fallback_poller = FallbackPoller(self, self.config.poll_concurrency)
+        return self.fallback_poller
+
+    def poll_interval(self):
+        interval = self.config.text_update_interval
+        if self.config.adaptive_polling:
+            return AdaptiveInterval(
+                interval, self.config.poll_interval_min, self.config.poll_interval_max
+            )
+        return AdaptiveInterval(interval, interval, interval)
+
+    # Picks up a run the journal knows about, returns the hosts which still
+    # need to be triggered
+    def resume(self, state):
+        pending = []
+        for host in self.hosts:
+            if host.name in state["done"]:
+                host.result, host.unreachable = state["done"][host.name]
+            elif host.name in state["running"]:
+                entry = state["running"][host.name]
+                host.id, host.job_invocation_id, host.sequence, host.since = entry
+                host.sent_since = host.since
+                host.started_at = host.progress_at = self.clock()
+                self.running[host.id] = host
+                if host.job_invocation_id not in self.job_invocation_ids:
+                    self.job_invocation_ids.append(host.job_invocation_id)
+            else:
+                pending.append(host)
+        self.logger.info(
+            f"Playbook run {self.playbook_run_id} resumed job invocations {self.job_invocation_ids}"
+        )
+        return pending
+
     async def finish(self):
         result = constants.RESULT_FAILURE
         infrastructure_error = None
@@ -135,31 +428,75 @@ class Run:
         elif all(host.result == constants.HOST_RESULT_SUCCESS for host in self.hosts):
             result = constants.RESULT_SUCCESS
 
+        self.result = result
         self.queue.playbook_run_completed(
             self.playbook_run_id,
             result,
             infrastructure_error=infrastructure_error,
         )
 
-    def update_hosts(self, hosts):
-        host_map = {host.name: host for host in self.hosts}
+    def update_hosts(self, hosts, job_invocation_id, batch=None):
+        batch = self.hosts if batch is None else batch
         for host in hosts:
-            host_map[host["name"]].id = host["id"]
+            self.hosts.named(host["name"]).id = host["id"]
 
-        for host in self.hosts:
+        now = self.clock()
+        for host in batch:
+            host.job_invocation_id = job_invocation_id
+            host.started_at = host.progress_at = now
             if host.id is None:
                 host.mark_as_failed("This host is not known by Satellite", None)
             else:
                 self.running[host.id] = host
 
+    # Finalizes the hosts which ran out of time and returns them
+    def expire(self, hosts):
+        config = self.config
+        now = self.clock()
+
+        def overdue(start, timeout):
+            return timeout and now >= start + timeout
+
+        run_expired = overdue(self.started_at, config.run_timeout)
+        if run_expired and not self.timed_out:
+            self.timed_out = True
+            metrics.increment(RUNS_TIMED_OUT)
+            self.logger.error(f"Playbook run {self.playbook_run_id} timed out")
+
+        expired = []
+        for host in hosts:
+            if run_expired:
+                metric, message = HOSTS_RUN_TIMEOUT, "Playbook run timed out"
+            elif overdue(host.started_at, config.host_timeout):
+                metric, message = HOSTS_TIMED_OUT, "Host timed out"
+            elif overdue(host.progress_at, config.progress_timeout):
+                metric = HOSTS_STALLED
+                message = f"No new output in {config.progress_timeout:g} seconds"
+            else:
+                continue
+            host.mark_as_failed(message, None, constants.HOST_RESULT_INFRA_FAILURE)
+            metrics.increment(metric)
+            self.running.pop(host.id, None)
+            expired.append(host)
+        return expired
+
     def abort(self, error, running=False, error_key="connection_error"):
         error = str(error)
         self.logger.error(
             f"Playbook run {self.playbook_run_id} encountered error '{error}', aborting."
         )
-        hosts = [host for id, host in self.running.items()] if running else self.hosts
+        if running:
+            hosts = list(self.running.values())
+        else:
+            hosts = [host for host in self.hosts if host.result is None]
         for host in hosts:
             host.mark_as_failed(error, None)
+        self.running = {}
+        for shard in self.shards:
+            shard.clear()
+        if self.fallback_poller is not None:
+            self.fallback_poller.stop()
+        self.result = constants.RESULT_FAILURE
         result = {}
         result[error_key] = error
         self.queue.playbook_run_completed(
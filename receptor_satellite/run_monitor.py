@@ -1,14 +1,36 @@
 import asyncio
+import time
+from collections import namedtuple, OrderedDict
+
+# What is left of a run once it finishes
+Tombstone = namedtuple("Tombstone", ["finished_at", "status"])
 
 
 class RunMonitor:
-    def __init__(self):
+    class Defaults:
+        TOMBSTONE_TTL = 86400  # seconds
+        MAX_TOMBSTONES = 10000
+
+    def __init__(
+        self,
+        tombstone_ttl=Defaults.TOMBSTONE_TTL,
+        max_tombstones=Defaults.MAX_TOMBSTONES,
+        clock=time.time,
+    ):
+        self.tombstone_ttl = tombstone_ttl
+        self.max_tombstones = max_tombstones
+        self.clock = clock
         self.__runs = {}
+        self.__tombstones = OrderedDict()
         self.__lock = asyncio.Lock()
 
+    def __len__(self):
+        return len(self.__runs) + len(self.__tombstones)
+
     async def register(self, run):
         async with self.__lock:
-            if run.playbook_run_id in self.__runs:
+            self.__expire()
+            if self.__known(run.playbook_run_id):
                 return False
             else:
                 self.__runs[run.playbook_run_id] = run
@@ -16,11 +38,36 @@ class RunMonitor:
 
     async def done(self, run):
         async with self.__lock:
-            self.__runs[run.playbook_run_id] = True
+            self.__runs.pop(run.playbook_run_id, None)
+            self.__tombstones[run.playbook_run_id] = Tombstone(self.clock(), run.result)
+            self.__tombstones.move_to_end(run.playbook_run_id)
+            self.__expire()
 
+    # Returns the Run while it is running, its Tombstone once it finished or
+    # None if the run is not known
     async def get(self, playbook_run_id):
         async with self.__lock:
-            return self.__runs.get(playbook_run_id)
+            self.__expire()
+            run = self.__runs.get(playbook_run_id)
+            if run is None:
+                return self.__tombstones.get(playbook_run_id)
+            return run
+
+    def __known(self, playbook_run_id):
+        return playbook_run_id in self.__runs or playbook_run_id in self.__tombstones
+
+    def clear(self):
+        self.__runs = {}
+        self.__tombstones = OrderedDict()
+
+    # Tombstones are kept in the order the runs finished in
+    def __expire(self):
+        deadline = self.clock() - self.tombstone_ttl
+        while self.__tombstones:
+            finished_at = next(iter(self.__tombstones.values())).finished_at
+            if finished_at > deadline and len(self.__tombstones) <= self.max_tombstones:
+                break
+            self.__tombstones.popitem(last=False)
 
 
 run_monitor = RunMonitor()
@@ -1,8 +1,19 @@
+import asyncio
 import json
+import os
 import ssl
+import time
 
 import aiohttp
 
+from .capabilities import capabilities
+from .host_cache import HostCache, host_cache
+from .journal import journal
+from .json_stream import ArrayItemDecoder
+from .metrics import metrics
+from .poll_coordinator import poll_coordinator
+from .retry_policy import circuit_breaker
+from .scheduler import RequestScheduler, request_scheduler
 
 HEALTH_CHECK_OK = "ok"
 HEALTH_CHECK_ERROR = "error"
@@ -59,19 +70,201 @@ HEALTH_STATUS_RESULTS = {
 }
 
 
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class StreamError(Exception):
+    pass
+
+
+class PoolEntry:
+    def __init__(self, session):
+        self.session = session
+        self.refcount = 0
+        self.idle_handle = None
+
+
+class SessionPool:
+    class Defaults:
+        LIMIT = 100
+        LIMIT_PER_HOST = 20
+        DNS_CACHE_TTL = 300  # seconds
+        KEEPALIVE_TIMEOUT = 30  # seconds
+        IDLE_TIMEOUT = 60  # seconds
+
+    def __init__(
+        self,
+        limit=Defaults.LIMIT,
+        limit_per_host=Defaults.LIMIT_PER_HOST,
+        dns_cache_ttl=Defaults.DNS_CACHE_TTL,
+        keepalive_timeout=Defaults.KEEPALIVE_TIMEOUT,
+        idle_timeout=Defaults.IDLE_TIMEOUT,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.idle_timeout = idle_timeout
+        self.__entries = {}
+
+    # Sessions are bound to the event loop they were created in, so the loop
+    # is part of the key alongside the Satellite URL and credentials
+    def __key(self, api):
+        return (asyncio.get_event_loop(), api.url, api.username, api.password)
+
+    async def acquire(self, api):
+        key = self.__key(api)
+        entry = self.__entries.get(key)
+        if entry is None or entry.session.closed:
+            entry = PoolEntry(self.__create_session(api))
+            self.__entries[key] = entry
+        if entry.idle_handle:
+            entry.idle_handle.cancel()
+            entry.idle_handle = None
+        entry.refcount += 1
+        return entry.session
+
+    async def release(self, api):
+        key = self.__key(api)
+        entry = self.__entries.get(key)
+        if entry is None or entry.session is not api.session:
+            # The session outlived its pool entry, nobody else can use it
+            await api.session.close()
+            return
+        entry.refcount -= 1
+        if entry.refcount == 0:
+            entry.idle_handle = key[0].call_later(
+                self.idle_timeout, self.__expire, key, entry
+            )
+
+    async def close_all(self):
+        loop = asyncio.get_event_loop()
+        for key in [key for key in self.__entries if key[0] is loop]:
+            entry = self.__entries.pop(key)
+            if entry.idle_handle:
+                entry.idle_handle.cancel()
+            await entry.session.close()
+
+    def __expire(self, key, entry):
+        if entry.refcount == 0 and self.__entries.get(key) is entry:
+            del self.__entries[key]
+            asyncio.ensure_future(entry.session.close())
+
+    def __create_session(self, api):
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        auth = aiohttp.BasicAuth(api.username, api.password)
+        return aiohttp.ClientSession(auth=auth, connector=connector)
+
+
+session_pool = SessionPool()
+
+
+class SSLContextCache:
+    def __init__(self):
+        self.__contexts = {}
+
+    def get(self, url, ca_file, validate_cert):
+        # A changed CA bundle shows up as a new mtime and replaces the context
+        mtime = os.path.getmtime(ca_file) if ca_file else None
+        key = (url, ca_file, validate_cert)
+        cached = self.__contexts.get(key)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, self.__create_context(ca_file, validate_cert))
+            self.__contexts[key] = cached
+        return cached[1]
+
+    def clear(self):
+        self.__contexts = {}
+
+    def __create_context(self, ca_file, validate_cert):
+        context = ssl.SSLContext()
+        if ca_file:
+            context.load_verify_locations(cafile=ca_file)
+        if validate_cert:
+            context.verify_mode = ssl.CERT_REQUIRED
+        return context
+
+
+ssl_context_cache = SSLContextCache()
+
+
+class HealthCheckCache:
+    class Defaults:
+        TTL = 30  # seconds
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.__results = {}
+        self.__in_flight = {}
+
+    async def get(self, key, ttl, probe):
+        cached = self.__results.get(key)
+        if cached is not None:
+            age = self.clock() - cached[0]
+            if age < ttl:
+                return dict(cached[1], cached=True, age=age)
+
+        # Concurrent checks share a single probe instead of each doing the
+        # round-trips to Satellite
+        flight_key = (asyncio.get_event_loop(),) + key
+        future = self.__in_flight.get(flight_key)
+        if future is None:
+            future = asyncio.ensure_future(probe())
+            self.__in_flight[flight_key] = future
+            future.add_done_callback(lambda done: self.__finish(flight_key, key, done))
+        result = await asyncio.shield(future)
+        return dict(result, cached=False, age=0)
+
+    def clear(self):
+        self.__results = {}
+
+    def __finish(self, flight_key, key, future):
+        self.__in_flight.pop(flight_key, None)
+        if not future.cancelled() and future.exception() is None:
+            self.__results[key] = (self.clock(), future.result())
+
+
+health_check_cache = HealthCheckCache()
+
+
 class SatelliteAPI:
-    def __init__(self, username, password, url, ca_file, validate_cert=True):
+    def __init__(
+        self,
+        username,
+        password,
+        url,
+        ca_file,
+        validate_cert=True,
+        host_cache_path=None,
+        host_cache_ttl=HostCache.Defaults.TTL,
+        health_check_ttl=HealthCheckCache.Defaults.TTL,
+        requests_per_second=RequestScheduler.Defaults.REQUESTS_PER_SECOND,
+        request_burst=RequestScheduler.Defaults.BURST,
+        max_runs=RequestScheduler.Defaults.MAX_RUNS,
+        journal_path=None,
+    ):
         self.username = username
         self.password = password
         self.url = url
         self.context = None
         self.session = None
+        self.circuit_breaker = circuit_breaker(url)
+        self.host_cache = host_cache(url, host_cache_path, host_cache_ttl)
+        self.health_check_ttl = health_check_ttl
+        self.poll_coordinator = poll_coordinator(url)
+        self.capabilities = capabilities(url)
+        self.journal = journal(journal_path)
+        self.scheduler = request_scheduler(
+            url, requests_per_second, request_burst, max_runs
+        )
         if url.startswith("https"):
-            self.context = ssl.SSLContext()
-            if ca_file:
-                self.context.load_verify_locations(cafile=ca_file)
-            if validate_cert:
-                self.context.verify_mode = ssl.CERT_REQUIRED
+            self.context = ssl_context_cache.get(url, ca_file, validate_cert)
 
     FALSE_VALUES = ["false", "no", "0", ""]
 
@@ -84,14 +277,32 @@ class SatelliteAPI:
             plugin_config["url"],
             plugin_config.get("ca_file"),
             False if validate_cert in cls.FALSE_VALUES else True,
+            plugin_config.get("host_cache_path"),
+            int(plugin_config.get("host_cache_ttl", HostCache.Defaults.TTL)),
+            int(plugin_config.get("health_check_ttl", HealthCheckCache.Defaults.TTL)),
+            float(
+                plugin_config.get(
+                    "requests_per_second", RequestScheduler.Defaults.REQUESTS_PER_SECOND
+                )
+            ),
+            int(plugin_config.get("request_burst", RequestScheduler.Defaults.BURST)),
+            int(plugin_config.get("max_runs", RequestScheduler.Defaults.MAX_RUNS)),
+            plugin_config.get("journal_path"),
         )
 
-    async def trigger(self, inputs, hosts):
+    async def trigger(self, inputs, hosts, host_ids=None):
+        # Hosts with a known ID are targeted by it, Foreman resolves these much
+        # cheaper than name searches
+        searches = []
+        if hosts:
+            searches.append("name ^ ({})".format(",".join(hosts)))
+        if host_ids:
+            searches.append(host_id_search(host_ids))
         payload = {
             "job_invocation": {
                 "feature": "ansible_run_playbook",
                 "inputs": inputs,
-                "host_ids": "name ^ ({})".format(",".join(hosts)),
+                "host_ids": " or ".join(searches),
             }
         }
         url = f"{self.url}/api/v2/job_invocations"
@@ -109,17 +320,23 @@ class SatelliteAPI:
         response = await self.request("GET", url, extra_data)
         return sanitize_response(response, [200])
 
-    async def outputs(self, job_invocation_id, host_ids, since):
+    async def outputs(self, job_invocation_id, host_ids, since, search_query=None):
         url = "{}/api/v2/job_invocations/{}/outputs".format(self.url, job_invocation_id)
-        ids = ",".join(map(str, host_ids))
         extra_data = {
             "auth": aiohttp.BasicAuth(self.username, self.password),
-            "json": {"search_query": f"id ^ ({ids})"},
+            "json": {"search_query": search_query or host_id_search(host_ids)},
             "headers": {"Content-Type": "application/json"},
         }
         if since is not None:
-            extra_data["params"]["since"] = str(since)
-        response = await self.request("POST", url, extra_data)
+            extra_data["params"] = {"since": str(since)}
+        response = await self.stream_request("POST", url, extra_data, [200])
+        if response["error"] is None and response["status"] == 200:
+            response["body"] = {
+                "outputs": stream_items(
+                    response["body"], "outputs", self.scheduler.release
+                )
+            }
+            return response
         return sanitize_response(response, [200])
 
     async def cancel(self, job_invocation_id):
@@ -137,54 +354,119 @@ class SatelliteAPI:
         return to_return
 
     async def health_check(self, satellite_instance_id):
+        result = await health_check_cache.get(
+            (self.url, satellite_instance_id),
+            self.health_check_ttl,
+            lambda: self.probe_health(satellite_instance_id),
+        )
+        return dict(result, metrics=metrics.snapshot())
+
+    async def probe_health(self, satellite_instance_id):
         await self.init_session()
         try:
-            # Ensure that the Foreman UUID matches the addressed one
-            url = f"{self.url}/api/settings?search=name%20%3D%20instance_id"
-            response = await self.request("GET", url, {})
-            status = sanitize_response(response, [200])
-            if status["error"]:
-                if status["status"] == -1:
-                    return self.health_check_response(HEALTH_NO_CONNECTION, status)
-                return self.health_check_response(HEALTH_BAD_HTTP_STATUS, status)
-            try:
-                gathered_id = status["body"]["results"][0]["value"]
-            except (IndexError, KeyError):
-                return self.health_check_response(HEALTH_UUID_UNKNOWN)
-            if satellite_instance_id.lower() != gathered_id.lower():
-                return self.health_check_response(
-                    HEALTH_UUID_MISMATCH, dict(uuid=gathered_id)
-                )
+            # All probes are sent at once, but evaluated in the original order
+            # so the precedence of the reported problems stays the same
+            (
+                (settings, settings_latency),
+                (statuses, statuses_latency),
+                batch_outputs,
+            ) = await asyncio.gather(
+                self.timed_request(
+                    "GET",
+                    f"{self.url}/api/settings?search=name%20%3D%20instance_id",
+                ),
+                self.timed_request("GET", f"{self.url}/api/statuses"),
+                self.probe_batch_outputs(),
+            )
+            self.capabilities.observe_version(satellite_version(statuses))
+            self.observe_batch_outputs(batch_outputs)
+            result = self.evaluate_health(satellite_instance_id, settings, statuses)
+            result["latency"] = dict(
+                settings=settings_latency, statuses=statuses_latency
+            )
+            return result
+        finally:
+            await self.close_session()
 
-            # Ensure that the Foreman has at least one working smart proxy with Ansible
-            url = f"{self.url}/api/statuses"
-            response = await self.request("GET", url, {})
-            status = sanitize_response(response, [200])
-            if status["error"]:
-                if status["status"] == -1:
-                    return self.health_check_response(HEALTH_NO_CONNECTION, status)
-                else:
-                    return self.health_check_response(HEALTH_BAD_HTTP_STATUS, status)
-            try:
-                ansible_proxies = [
-                    sp
-                    for sp in status["body"]["results"]["foreman"]["smart_proxies"]
-                    if "ansible" in sp["features"]
-                ]
-            except KeyError:
-                return self.health_check_response(HEALTH_SP_UNKNOWN)
+    # Job invocation 0 never exists, so Satellite answers with a 404 either
+    # way, but only one without the route lacks batch outputs
+    async def probe_batch_outputs(self):
+        url = f"{self.url}/api/v2/job_invocations/0/outputs"
+        extra_data = {
+            "json": {"search_query": host_id_search([0])},
+            "headers": {"Content-Type": "application/json"},
+        }
+        return await self.request("POST", url, extra_data)
+
+    def observe_batch_outputs(self, response):
+        try:
+            response = sanitize_response(response, [200])
+        except (ValueError, KeyError, TypeError):
+            return
+        if missing_route(response):
+            self.capabilities.remember_batch_outputs(False)
+        elif response["status"] in (200, 404):
+            self.capabilities.remember_batch_outputs(True)
+
+    def evaluate_health(self, satellite_instance_id, settings, statuses):
+        # Ensure that the Foreman UUID matches the addressed one
+        status = sanitize_response(settings, [200])
+        if status["error"]:
+            if status["status"] == -1:
+                return self.health_check_response(HEALTH_NO_CONNECTION, status)
+            return self.health_check_response(HEALTH_BAD_HTTP_STATUS, status)
+        try:
+            gathered_id = status["body"]["results"][0]["value"]
+        except (IndexError, KeyError):
+            return self.health_check_response(HEALTH_UUID_UNKNOWN)
+        if satellite_instance_id.lower() != gathered_id.lower():
+            return self.health_check_response(
+                HEALTH_UUID_MISMATCH, dict(uuid=gathered_id)
+            )
+
+        # Ensure that the Foreman has at least one working smart proxy with Ansible
+        status = sanitize_response(statuses, [200])
+        if status["error"]:
+            if status["status"] == -1:
+                return self.health_check_response(HEALTH_NO_CONNECTION, status)
             else:
-                if not ansible_proxies:
-                    return self.health_check_response(HEALTH_SP_NO_ANSIBLE)
-                ok_proxies = [sp for sp in ansible_proxies if sp["status"] == "ok"]
-                if not ok_proxies:
-                    return self.health_check_response(HEALTH_SP_OFFLINE)
+                return self.health_check_response(HEALTH_BAD_HTTP_STATUS, status)
+        try:
+            ansible_proxies = [
+                sp
+                for sp in status["body"]["results"]["foreman"]["smart_proxies"]
+                if "ansible" in sp["features"]
+            ]
+        except KeyError:
+            return self.health_check_response(HEALTH_SP_UNKNOWN)
+        else:
+            if not ansible_proxies:
+                return self.health_check_response(HEALTH_SP_NO_ANSIBLE)
+            ok_proxies = [sp for sp in ansible_proxies if sp["status"] == "ok"]
+            if not ok_proxies:
+                return self.health_check_response(HEALTH_SP_OFFLINE)
 
-            return self.health_check_response(HEALTH_OK)
+        return self.health_check_response(HEALTH_OK)
+
+    async def timed_request(self, method, url):
+        # Returns the response along with its latency in milliseconds, time
+        # spent waiting for the scheduler does not count
+        await self.scheduler.acquire()
+        try:
+            started_at = time.monotonic()
+            response = await self.exchange(method, url, {})
+            return response, round((time.monotonic() - started_at) * 1000)
         finally:
-            await self.close_session()
+            self.scheduler.release()
 
     async def request(self, method, url, extra_data):
+        await self.scheduler.acquire()
+        try:
+            return await self.exchange(method, url, extra_data)
+        finally:
+            self.scheduler.release()
+
+    async def exchange(self, method, url, extra_data):
         try:
             extra_data["ssl"] = self.context
             async with self.session.request(method, url, **extra_data) as response:
@@ -194,16 +476,83 @@ class SatelliteAPI:
         except Exception as e:
             return dict(error=e, body="{}", status=-1)
 
+    async def stream_request(self, method, url, extra_data, expected_statuses):
+        # Unlike request, responses with an expected status are returned
+        # without reading their body, which is left for the caller to stream.
+        # The scheduler slot is then released by stream_items.
+        await self.scheduler.acquire()
+        streaming = False
+        try:
+            extra_data["ssl"] = self.context
+            response = await self.session.request(method, url, **extra_data)
+            if response.status in expected_statuses:
+                streaming = True
+                return dict(status=response.status, body=response, error=None)
+            try:
+                body = await response.text()
+            finally:
+                response.release()
+            return dict(status=response.status, body=body, error=None)
+        except Exception as e:
+            return dict(error=e, body="{}", status=-1)
+        finally:
+            if not streaming:
+                self.scheduler.release()
+
     async def init_session(self):
-        auth = aiohttp.BasicAuth(self.username, self.password)
-        self.session = aiohttp.ClientSession(auth=auth)
+        if self.session is None:
+            self.session = await session_pool.acquire(self)
 
     async def close_session(self):
         if self.session:
-            await self.session.close()
+            await session_pool.release(self)
         self.session = None
 
 
+# A 404 may also mean the job invocation is gone, only a routing error says
+# the endpoint itself is missing
+def missing_route(response):
+    if response.get("status") != 404:
+        return False
+    return "route" in str(response.get("error")).lower()
+
+
+def host_id_search(host_ids):
+    ids = ",".join(map(str, host_ids))
+    return f"id ^ ({ids})"
+
+
+async def stream_items(response, key, release):
+    decoder = ArrayItemDecoder(key)
+    try:
+        async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+            for item in decoder.feed(chunk):
+                yield item
+        decoder.close()
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        raise StreamError(str(e)) from e
+    finally:
+        response.release()
+        release()
+
+
+# Foreman's version along with the version of its remote execution plugin,
+# which provides the endpoints used here
+def satellite_version(statuses):
+    if statuses["error"] or statuses["status"] != 200:
+        return None
+    try:
+        foreman = json.loads(statuses["body"])["results"]["foreman"]
+        version = foreman["version"]
+        for plugin in foreman.get("plugins", []):
+            name, plugin_version = plugin.split(", ")[:2]
+            if name == "Foreman plugin: foreman_remote_execution":
+                version += f" foreman_remote_execution-{plugin_version}"
+        return version
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
 def sanitize_response(response, expected_statuses):
     if not response["error"]:
         response["body"] = json.loads(response["body"])
@@ -0,0 +1,104 @@
+import asyncio
+import time
+from collections import deque
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated_at = clock()
+
+    async def take(self):
+        while True:
+            now = self.clock()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class InFlightLimit:
+    def __init__(self, limit):
+        self.limit = limit
+        self.__semaphores = {}
+
+    # Semaphores belong to the loop they are used in
+    def semaphore(self):
+        loop = asyncio.get_event_loop()
+        if loop not in self.__semaphores:
+            self.__semaphores[loop] = asyncio.Semaphore(self.limit)
+        return self.__semaphores[loop]
+
+
+class RequestScheduler:
+    class Defaults:
+        MAX_IN_FLIGHT = 32  # Across all Satellites
+        REQUESTS_PER_SECOND = 20
+        BURST = 40
+        MAX_RUNS = 50
+
+    def __init__(
+        self,
+        rate=Defaults.REQUESTS_PER_SECOND,
+        burst=Defaults.BURST,
+        max_runs=Defaults.MAX_RUNS,
+        in_flight=None,
+    ):
+        self.bucket = TokenBucket(rate, burst)
+        self.in_flight = in_flight or in_flight_limit
+        self.max_runs = max_runs
+        self.runs = 0
+        self.__run_waiters = deque()
+
+    async def acquire(self):
+        await self.bucket.take()
+        await self.in_flight.semaphore().acquire()
+
+    def release(self):
+        self.in_flight.semaphore().release()
+
+    async def admit(self):
+        while self.runs >= self.max_runs:
+            waiter = asyncio.get_event_loop().create_future()
+            self.__run_waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Hand the wakeup over if it arrived together with the cancel
+                if waiter.done() and not waiter.cancelled():
+                    self.__wake_next()
+                raise
+        self.runs += 1
+
+    def leave(self):
+        self.runs -= 1
+        self.__wake_next()
+
+    def __wake_next(self):
+        while self.__run_waiters:
+            waiter = self.__run_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+
+in_flight_limit = InFlightLimit(RequestScheduler.Defaults.MAX_IN_FLIGHT)
+schedulers = {}
+
+
+def request_scheduler(
+    url,
+    rate=RequestScheduler.Defaults.REQUESTS_PER_SECOND,
+    burst=RequestScheduler.Defaults.BURST,
+    max_runs=RequestScheduler.Defaults.MAX_RUNS,
+):
+    if url not in schedulers:
+        schedulers[url] = RequestScheduler(rate, burst, max_runs)
+    return schedulers[url]
@@ -0,0 +1,64 @@
+from .satellite_api import host_id_search
+
+
+class Shard:
+    def __init__(self, job_invocation_id, hosts):
+        self.job_invocation_id = job_invocation_id
+        self.hosts = {host.id: host for host in hosts}
+        self.interval = None
+        # Newest output timestamp Satellite returned for the shard so far
+        self.cursor = None
+        self.__host_ids = None
+        self.__search_query = None
+
+    def __len__(self):
+        return len(self.hosts)
+
+    # The ID list and search query only change when hosts finish, so they are
+    # rebuilt on membership changes rather than on every poll
+    @property
+    def host_ids(self):
+        if self.__host_ids is None:
+            self.__host_ids = list(self.hosts.keys())
+        return self.__host_ids
+
+    @property
+    def search_query(self):
+        if self.__search_query is None:
+            self.__search_query = host_id_search(self.host_ids)
+        return self.__search_query
+
+    @property
+    def since(self):
+        if self.cursor is not None:
+            return self.cursor
+        # Until Satellite returned anything, hosts resumed from the journal may
+        # be at different points. Start from the oldest one and let each host
+        # drop the chunks it has already seen
+        cursors = [host.since for host in self.hosts.values()]
+        if not cursors or cursors[0] is None:
+            return None
+        return min(cursors)
+
+    # Everything up to the newest timestamp of a fully processed response was
+    # returned, hosts without new output don't hold the cursor back
+    def advance(self, timestamp):
+        if timestamp is not None and (self.cursor is None or timestamp > self.cursor):
+            self.cursor = timestamp
+
+    def remove(self, host_id):
+        if self.hosts.pop(host_id, None) is not None:
+            self.__host_ids = None
+            self.__search_query = None
+
+    def clear(self):
+        self.hosts = {}
+        self.__host_ids = None
+        self.__search_query = None
+
+
+def split_into_shards(job_invocation_id, hosts, size):
+    return [
+        Shard(job_invocation_id, hosts[start : start + size])
+        for start in range(0, len(hosts), size)
+    ]
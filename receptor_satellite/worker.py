@@ -2,10 +2,11 @@ import asyncio
 import json
 import logging
 
+from .event_loop import resident_loop
 from .satellite_api import SatelliteAPI, HEALTH_CHECK_ERROR, HEALTH_STATUS_RESULTS
 from .response.response_queue import ResponseQueue
 from .response import constants
-from .run_monitor import run_monitor
+from .run_monitor import run_monitor, Tombstone
 from .run import Run
 
 
@@ -23,33 +24,40 @@ def configure_logger():
     return logger
 
 
-async def cancel_run(satellite_api, run_id, queue, logger):
+async def cancel_run(run_id, queue, logger):
     logger.info(f"Cancelling playbook run {run_id}")
     run = await run_monitor.get(run_id)
     status = None
-    if run is True:
+    if isinstance(run, Tombstone):
         logger.info(f"Playbook run {run_id} is already finished")
         status = constants.CANCEL_RESULT_FINISHED
     elif run is None:
         logger.info(f"Playbook run {run_id} is not known by receptor")
         status = constants.CANCEL_RESULT_FAILURE
     else:
-        await satellite_api.init_session()
-        response = await satellite_api.cancel(run.job_invocation_id)
-        run.cancelled = True
-        await satellite_api.close_session()
-        if response["status"] == 422:
-            status = constants.CANCEL_RESULT_FINISHED
-        elif response["status"] == 200:
+        # The run's session stays open until the run finishes
+        satellite_api = run.satellite_api
+        job_invocation_ids = list(run.job_invocation_ids)
+        responses = await asyncio.gather(
+            *[satellite_api.cancel(id) for id in job_invocation_ids]
+        )
+        run.cancel()
+        # Batches triggered in the meantime did not see the run was cancelled
+        late = [id for id in run.job_invocation_ids if id not in job_invocation_ids]
+        responses += await asyncio.gather(*[satellite_api.cancel(id) for id in late])
+        statuses = [response["status"] for response in responses]
+        # Runs which did not trigger anything yet won't do so anymore
+        if not statuses or 200 in statuses:
             status = constants.CANCEL_RESULT_CANCELLING
+        elif statuses and all(code == 422 for code in statuses):
+            status = constants.CANCEL_RESULT_FINISHED
         else:
             status = constants.CANCEL_RESULT_FAILURE
     queue.playbook_run_cancel_ack(run_id, status)
 
 
 def run(coroutine):
-    loop = asyncio.new_event_loop()
-    return loop.run_until_complete(coroutine)
+    return resident_loop.run(coroutine)
 
 
 @receptor_export
@@ -65,9 +73,8 @@ def execute(message, config, queue):
 def cancel(message, config, queue):
     logger = configure_logger()
     queue = ResponseQueue(queue)
-    satellite_api = SatelliteAPI.from_plugin_config(config)
     payload = json.loads(message.raw_payload)
-    run(cancel_run(satellite_api, payload.get("playbook_run_id"), queue, logger))
+    run(cancel_run(payload.get("playbook_run_id"), queue, logger))
 
 
 @receptor_export
@@ -6,6 +6,7 @@ __all__ = [
     "BAD_UUID",
     "UUID_URL",
     "STATUSES_URL",
+    "BATCH_OUTPUTS_URL",
     "MISSING_UUID_RESPONSE_BODY",
     "UUID_RESPONSE_BODY",
     "STATUSES_RESPONSE_BODY",
@@ -21,6 +22,7 @@ UUID = "dd77f17a-2fe1-4f7a-b220-58f4140a1f9e"
 BAD_UUID = "1"
 UUID_URL = f"{PLUGIN_CONFIG['url']}/api/settings?search=name%20%3D%20instance_id"
 STATUSES_URL = f"{PLUGIN_CONFIG['url']}/api/statuses"
+BATCH_OUTPUTS_URL = f"{PLUGIN_CONFIG['url']}/api/v2/job_invocations/0/outputs"
 MISSING_UUID_RESPONSE_BODY = json.dumps(
     {
         "total": 230,
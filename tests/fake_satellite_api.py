@@ -1,7 +1,21 @@
+from receptor_satellite.capabilities import Capabilities
+from receptor_satellite.host_cache import HostCache
+from receptor_satellite.journal import Journal
+from receptor_satellite.poll_coordinator import PollCoordinator
+from receptor_satellite.retry_policy import CircuitBreaker
+from receptor_satellite.scheduler import RequestScheduler
+
+
 class FakeSatelliteAPI:
     def __init__(self, responses=[]):
         self.requests = []
         self.responses = []
+        self.circuit_breaker = CircuitBreaker()
+        self.host_cache = HostCache()
+        self.poll_coordinator = PollCoordinator()
+        self.capabilities = Capabilities()
+        self.journal = Journal()
+        self.scheduler = RequestScheduler()
 
     def record_request(self, request_type, data):
         self.requests.append((request_type, data))
@@ -11,13 +25,25 @@ class FakeSatelliteAPI:
         self.record_request("output", (job_id, host_id, since))
         return self.__pop_responses()
 
-    async def outputs(self, job_id, host_ids, since):
+    async def outputs(self, job_id, host_ids, since, search_query=None):
         print(f"{(job_id, host_ids, since)}")
         self.record_request("outputs", (job_id, host_ids, since))
+        response = self.__pop_responses()
+        body = response.get("body")
+        if body and isinstance(body.get("outputs"), list):
+            outputs = self.__stream(body["outputs"])
+            response = dict(response, body=dict(body, outputs=outputs))
+        return response
+
+    async def trigger(self, inputs, hosts, host_ids=None):
+        if host_ids:
+            self.record_request("trigger", (inputs, hosts, host_ids))
+        else:
+            self.record_request("trigger", (inputs, hosts))
         return self.__pop_responses()
 
-    async def trigger(self, inputs, hosts):
-        self.record_request("trigger", (inputs, hosts))
+    async def cancel(self, job_id):
+        self.record_request("cancel", job_id)
         return self.__pop_responses()
 
     async def init_session(self):
@@ -26,6 +52,10 @@ class FakeSatelliteAPI:
     async def close_session(self):
         pass
 
+    async def __stream(self, items):
+        for item in items:
+            yield item
+
     def __pop_responses(self):
         [response, *rest] = self.responses
         self.responses = rest
@@ -0,0 +1,44 @@
+from receptor_satellite.capabilities import Capabilities
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_batch_outputs_support_expires():
+    clock = FakeClock()
+    capabilities = Capabilities(ttl=60, negative_ttl=10, clock=clock)
+    assert capabilities.batch_outputs is None
+    capabilities.remember_batch_outputs(True)
+    clock.now += 59
+    assert capabilities.batch_outputs is True
+    clock.now += 1
+    assert capabilities.batch_outputs is None
+
+
+def test_missing_batch_outputs_expire_sooner():
+    clock = FakeClock()
+    capabilities = Capabilities(ttl=60, negative_ttl=10, clock=clock)
+    capabilities.remember_batch_outputs(False)
+    clock.now += 9
+    assert capabilities.batch_outputs is False
+    clock.now += 1
+    assert capabilities.batch_outputs is None
+
+
+def test_new_version_forgets_capabilities():
+    capabilities = Capabilities(clock=FakeClock())
+    capabilities.observe_version("1.24.0")
+    capabilities.remember_batch_outputs(False)
+
+    capabilities.observe_version("1.24.0")
+    capabilities.observe_version(None)
+    assert capabilities.batch_outputs is False
+
+    capabilities.observe_version("2.3.0")
+    assert capabilities.version == "2.3.0"
+    assert capabilities.batch_outputs is None
@@ -10,20 +10,84 @@ ERROR_HANDLING_TEST_CASES = [
             "text_updates": Config.Defaults.TEXT_UPDATES,
             "text_update_interval": Config.Defaults.TEXT_UPDATE_INTERVAL,
             "text_update_full": Config.Defaults.TEXT_UPDATE_FULL,
+            "poll_shard_size": Config.Defaults.POLL_SHARD_SIZE,
+            "poll_concurrency": Config.Defaults.POLL_CONCURRENCY,
+            "trigger_batch_size": Config.Defaults.TRIGGER_BATCH_SIZE,
+            "trigger_concurrency": Config.Defaults.TRIGGER_CONCURRENCY,
+            "adaptive_polling": Config.Defaults.ADAPTIVE_POLLING,
+            "poll_interval_min": Config.Defaults.POLL_INTERVAL_MIN,
+            "poll_interval_max": Config.Defaults.POLL_INTERVAL_MAX,
+            "run_timeout": Config.Defaults.RUN_TIMEOUT,
+            "host_timeout": Config.Defaults.HOST_TIMEOUT,
+            "progress_timeout": Config.Defaults.PROGRESS_TIMEOUT,
+            "output_memory_limit": Config.Defaults.OUTPUT_MEMORY_LIMIT,
+            "text_update_delta": Config.Defaults.TEXT_UPDATE_DELTA,
+            "text_update_checkpoint": Config.Defaults.TEXT_UPDATE_CHECKPOINT,
+            "host_console_limit": Config.Defaults.HOST_CONSOLE_LIMIT,
+            "run_console_limit": Config.Defaults.RUN_CONSOLE_LIMIT,
         },
         [],
     ),
     (
-        {"text_updates": 27, "text_update_interval": -13, "text_update_full": []},
+        {
+            "text_updates": 27,
+            "text_update_interval": -13,
+            "text_update_full": [],
+            "poll_shard_size": 0,
+            "poll_concurrency": "4",
+            "trigger_batch_size": -1,
+            "trigger_concurrency": 0,
+            "adaptive_polling": "yes",
+            "poll_interval_min": 500,
+            "poll_interval_max": 999,
+            "run_timeout": -1,
+            "host_timeout": 1.5,
+            "progress_timeout": "never",
+            "output_memory_limit": -1,
+            "text_update_delta": 1,
+            "text_update_checkpoint": 0,
+            "host_console_limit": -1,
+            "run_console_limit": "1M",
+        },
         {
             "text_updates": Config.Defaults.TEXT_UPDATES,
             "text_update_interval": Config.Defaults.TEXT_UPDATE_INTERVAL,
             "text_update_full": Config.Defaults.TEXT_UPDATE_FULL,
+            "poll_shard_size": Config.Defaults.POLL_SHARD_SIZE,
+            "poll_concurrency": Config.Defaults.POLL_CONCURRENCY,
+            "trigger_batch_size": Config.Defaults.TRIGGER_BATCH_SIZE,
+            "trigger_concurrency": Config.Defaults.TRIGGER_CONCURRENCY,
+            "adaptive_polling": Config.Defaults.ADAPTIVE_POLLING,
+            "poll_interval_min": Config.Defaults.POLL_INTERVAL_MIN,
+            "poll_interval_max": Config.Defaults.POLL_INTERVAL_MAX,
+            "run_timeout": Config.Defaults.RUN_TIMEOUT,
+            "host_timeout": Config.Defaults.HOST_TIMEOUT,
+            "progress_timeout": Config.Defaults.PROGRESS_TIMEOUT,
+            "output_memory_limit": Config.Defaults.OUTPUT_MEMORY_LIMIT,
+            "text_update_delta": Config.Defaults.TEXT_UPDATE_DELTA,
+            "text_update_checkpoint": Config.Defaults.TEXT_UPDATE_CHECKPOINT,
+            "host_console_limit": Config.Defaults.HOST_CONSOLE_LIMIT,
+            "run_console_limit": Config.Defaults.RUN_CONSOLE_LIMIT,
         },
         [
             "Expected the value of text_updates '27' to be a boolean",
             "Expected the value of text_update_full '[]' to be a boolean",
             "Expected the value of text_update_interval '-13' to be an integer greater or equal than 5000",
+            "Expected the value of poll_shard_size '0' to be a positive integer",
+            "Expected the value of poll_concurrency '4' to be a positive integer",
+            "Expected the value of trigger_batch_size '-1' to be a non-negative integer",
+            "Expected the value of trigger_concurrency '0' to be a positive integer",
+            "Expected the value of adaptive_polling 'yes' to be a boolean",
+            "Expected the value of poll_interval_min '500' to be an integer greater or equal than 1000",
+            "Expected the value of poll_interval_max '999' to be an integer greater or equal than poll_interval_min",
+            "Expected the value of run_timeout '-1' to be a non-negative integer",
+            "Expected the value of host_timeout '1.5' to be a non-negative integer",
+            "Expected the value of progress_timeout 'never' to be a non-negative integer",
+            "Expected the value of output_memory_limit '-1' to be a non-negative integer",
+            "Expected the value of text_update_delta '1' to be a boolean",
+            "Expected the value of text_update_checkpoint '0' to be a positive integer",
+            "Expected the value of host_console_limit '-1' to be a non-negative integer",
+            "Expected the value of run_console_limit '1M' to be a non-negative integer",
         ],
     ),
     (
@@ -31,11 +95,66 @@ ERROR_HANDLING_TEST_CASES = [
             "text_updates": True,
             "text_update_interval": 10000,
             "text_update_full": False,
+            "poll_shard_size": 50,
+            "poll_concurrency": 2,
+            "trigger_batch_size": 100,
+            "trigger_concurrency": 3,
+            "adaptive_polling": True,
+            "poll_interval_min": 2000,
+            "poll_interval_max": 30000,
+            "run_timeout": 86400000,
+            "host_timeout": 3600000,
+            "progress_timeout": 21600000,
+            "output_memory_limit": 65536,
+            "text_update_delta": True,
+            "text_update_checkpoint": 5,
+            "host_console_limit": 65536,
+            "run_console_limit": 1048576,
         },
         {
             "text_updates": True,
             "text_update_interval": 10000,
             "text_update_full": False,
+            "poll_shard_size": 50,
+            "poll_concurrency": 2,
+            "trigger_batch_size": 100,
+            "trigger_concurrency": 3,
+            "adaptive_polling": True,
+            "poll_interval_min": 2000,
+            "poll_interval_max": 30000,
+            "run_timeout": 86400000,
+            "host_timeout": 3600000,
+            "progress_timeout": 21600000,
+            "output_memory_limit": 65536,
+            "text_update_delta": True,
+            "text_update_checkpoint": 5,
+            "host_console_limit": 65536,
+            "run_console_limit": 1048576,
+        },
+        [],
+    ),
+    # Without an explicit maximum, the maximum follows a larger minimum
+    (
+        {"poll_interval_min": 90000},
+        {
+            "text_updates": Config.Defaults.TEXT_UPDATES,
+            "text_update_interval": Config.Defaults.TEXT_UPDATE_INTERVAL,
+            "text_update_full": Config.Defaults.TEXT_UPDATE_FULL,
+            "poll_shard_size": Config.Defaults.POLL_SHARD_SIZE,
+            "poll_concurrency": Config.Defaults.POLL_CONCURRENCY,
+            "trigger_batch_size": Config.Defaults.TRIGGER_BATCH_SIZE,
+            "trigger_concurrency": Config.Defaults.TRIGGER_CONCURRENCY,
+            "adaptive_polling": Config.Defaults.ADAPTIVE_POLLING,
+            "poll_interval_min": 90000,
+            "poll_interval_max": 90000,
+            "run_timeout": Config.Defaults.RUN_TIMEOUT,
+            "host_timeout": Config.Defaults.HOST_TIMEOUT,
+            "progress_timeout": Config.Defaults.PROGRESS_TIMEOUT,
+            "output_memory_limit": Config.Defaults.OUTPUT_MEMORY_LIMIT,
+            "text_update_delta": Config.Defaults.TEXT_UPDATE_DELTA,
+            "text_update_checkpoint": Config.Defaults.TEXT_UPDATE_CHECKPOINT,
+            "host_console_limit": Config.Defaults.HOST_CONSOLE_LIMIT,
+            "run_console_limit": Config.Defaults.RUN_CONSOLE_LIMIT,
         },
         [],
     ),
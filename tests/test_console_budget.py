@@ -0,0 +1,33 @@
+from receptor_satellite.console_budget import ConsoleBudget
+
+
+def test_no_limits():
+    budget = ConsoleBudget()
+    assert budget.grow(None, 0, 10**9) is None
+    assert budget.size == 10**9
+
+
+def test_host_limit():
+    budget = ConsoleBudget(host_limit=10)
+    assert budget.grow(None, 0, 10) is None
+    assert budget.grow(None, 10, 11) == 10
+
+
+def test_run_limit_keeps_what_hosts_had():
+    budget = ConsoleBudget(run_limit=10, host_limit=8, min_cap=0)
+    assert budget.grow(None, 0, 6) is None
+    assert budget.grow(None, 0, 3) is None
+    # The run goes over while this host had 3 bytes
+    assert budget.grow(None, 3, 5) == 3
+    assert budget.grow(3, 5, 9) == 3
+    assert budget.grow(None, 6, 7) == 6
+    assert budget.size == 16
+
+
+def test_run_limit_leaves_hosts_a_minimum():
+    budget = ConsoleBudget(run_limit=10, min_cap=4)
+    # The host going over on its first poll still gets the minimum
+    assert budget.grow(None, 0, 20) == 4
+    # Others may keep growing up to the minimum
+    assert budget.grow(None, 0, 3) == 4
+    assert budget.grow(None, 6, 7) == 6
@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+import pytest
+
+from receptor_satellite.event_loop import ResidentLoop
+
+
+async def current_loop():
+    return asyncio.get_event_loop(), threading.current_thread()
+
+
+async def fail():
+    raise ValueError("controlled failure")
+
+
+def test_coroutines_share_resident_loop():
+    resident = ResidentLoop()
+    first_loop, first_thread = resident.run(current_loop())
+    second_loop, second_thread = resident.run(current_loop())
+    assert first_loop is second_loop
+    assert first_thread is second_thread
+    assert first_thread is not threading.current_thread()
+    resident.shutdown()
+
+
+def test_errors_propagate():
+    resident = ResidentLoop()
+    with pytest.raises(ValueError):
+        resident.run(fail())
+    resident.shutdown()
+
+
+def test_shutdown_stops_loop():
+    resident = ResidentLoop()
+    loop, thread = resident.run(current_loop())
+    resident.shutdown()
+    assert not thread.is_alive()
+    assert loop.is_closed()
+
+    # The loop is started again on demand
+    new_loop, _thread = resident.run(current_loop())
+    assert new_loop is not loop
+    resident.shutdown()
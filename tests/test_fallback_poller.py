@@ -0,0 +1,187 @@
+import pytest
+
+from test_helper import base_scenario  # noqa: F401
+from receptor_satellite.fallback_poller import FallbackPoller, TimerWheel
+from receptor_satellite.host import Host
+import receptor_satellite.response.constants as constants
+import receptor_satellite.response.messages as messages
+
+
+def test_timer_wheel():
+    wheel = TimerWheel(4, 1)
+    wheel.schedule("a", 1)
+    wheel.schedule("b", 2.2)
+    wheel.schedule("c", 6)
+    assert len(wheel) == 3
+    assert [wheel.advance() for _ in range(6)] == [["a"], ["b"], [], [], [], ["c"]]
+    assert len(wheel) == 0
+
+
+def test_timer_wheel_drain():
+    wheel = TimerWheel(4, 1)
+    wheel.schedule("a", 1)
+    wheel.schedule("b", 9)
+    assert sorted(wheel.drain()) == ["a", "b"]
+    assert len(wheel) == 0
+    assert wheel.advance() == []
+
+
+def host_output(output, complete):
+    return {
+        "error": None,
+        "body": {"complete": complete, "output": [{"output": output}]},
+    }
+
+
+@pytest.mark.asyncio
+async def test_hosts_are_polled_staggered(base_scenario):  # noqa: F811
+    queue, logger, satellite_api, run = base_scenario
+    hosts = [Host(run, id, f"host{id}") for id in range(1, 4)]
+    for host in hosts:
+        run.running[host.id] = host
+    satellite_api.responses = [
+        host_output("Exit status: 0", True),
+        host_output("Running", False),
+        host_output("Exit status: 0", True),
+        host_output("Exit status: 0", True),
+    ]
+
+    poller = FallbackPoller(run, 2, slots=5)
+    poller.add(hosts)
+    await poller.wait()
+
+    # Every host polls in its own slot, finished ones are not polled again
+    assert satellite_api.requests == [
+        ("output", (None, 1, None)),
+        ("output", (None, 2, None)),
+        ("output", (None, 3, None)),
+        ("output", (None, 2, None)),
+    ]
+    assert run.running == {}
+    assert [host.result for host in hosts] == [constants.HOST_RESULT_SUCCESS] * 3
+
+
+@pytest.mark.asyncio
+async def test_failing_hosts_give_up(base_scenario):  # noqa: F811
+    queue, logger, satellite_api, run = base_scenario
+    host = Host(run, 1, "host1")
+    satellite_api.responses = [{"error": "controlled failure"}] * 5
+
+    poller = FallbackPoller(run, 1)
+    poller.add([host])
+    await poller.wait()
+
+    assert len(satellite_api.requests) == 5
+    assert queue.messages == [
+        messages.playbook_run_update("host1", "play_id", "controlled failure", 0),
+        messages.playbook_run_finished("host1", "play_id", constants.RESULT_FAILURE),
+    ]
+
+
+class PollerTestCase:
+    def __init__(
+        self, cancelled=False, api_output=None, api_requests=[], queue_messages=[]
+    ):
+        self.cancelled = cancelled
+        self.api_output = api_output
+        self.api_requests = api_requests
+        self.queue_messages = queue_messages
+
+
+POLLER_TEST_CASES = [
+    # If polling receives an error from the API, it marks the
+    # host as failed
+    PollerTestCase(
+        api_output={"error": "controlled failure"},
+        api_requests=[("output", (None, 1, None)) for _x in range(5)],
+        queue_messages=[
+            messages.playbook_run_update("host1", "play_id", "controlled failure", 0),
+            messages.playbook_run_finished(
+                "host1", "play_id", constants.RESULT_FAILURE
+            ),
+        ],
+    ),
+    # If the last output from the API ends with Exit status: 0, mark
+    # the run on the host as success
+    PollerTestCase(
+        api_output={
+            "error": None,
+            "body": {"complete": True, "output": [{"output": "Exit status: 0"}]},
+        },
+        api_requests=[("output", (None, 1, None))],
+        queue_messages=[
+            messages.playbook_run_update("host1", "play_id", "Exit status: 0", 0),
+            messages.playbook_run_finished(
+                "host1", "play_id", constants.RESULT_SUCCESS
+            ),
+        ],
+    ),
+    # If the run was cancelled, but the host managed to finish
+    # successfully, mark it as success
+    PollerTestCase(
+        cancelled=True,
+        api_output={
+            "error": None,
+            "body": {"complete": True, "output": [{"output": "Exit status: 0"}]},
+        },
+        api_requests=[("output", (None, 1, None))],
+        queue_messages=[
+            messages.playbook_run_update("host1", "play_id", "Exit status: 0", 0),
+            messages.playbook_run_finished(
+                "host1", "play_id", constants.RESULT_SUCCESS
+            ),
+        ],
+    ),
+    # If the host failed, mark it as failed
+    PollerTestCase(
+        api_output={
+            "error": None,
+            "body": {"complete": True, "output": [{"output": "Exit status: 123"}]},
+        },
+        api_requests=[("output", (None, 1, None))],
+        queue_messages=[
+            messages.playbook_run_update("host1", "play_id", "Exit status: 123", 0),
+            messages.playbook_run_finished(
+                "host1", "play_id", constants.RESULT_FAILURE, True, 123
+            ),
+        ],
+    ),
+    # If the run was cancelled and the run on the host failed, mark it
+    # as cancelled
+    PollerTestCase(
+        cancelled=True,
+        api_output={
+            "error": None,
+            "body": {"complete": True, "output": [{"output": "Exit status: 123"}]},
+        },
+        api_requests=[("output", (None, 1, None))],
+        queue_messages=[
+            messages.playbook_run_update("host1", "play_id", "Exit status: 123", 0),
+            messages.playbook_run_finished(
+                "host1", "play_id", constants.RESULT_CANCEL, True, 123
+            ),
+        ],
+    ),
+]
+
+
+@pytest.fixture(params=POLLER_TEST_CASES)
+def poller_scenario(request, base_scenario):  # noqa: F811
+    queue, logger, satellite_api, run = base_scenario
+    run.cancelled = request.param.cancelled
+    host = Host(run, 1, "host1")
+
+    yield (queue, host, request.param)
+
+
+@pytest.mark.asyncio
+async def test_poller(poller_scenario):
+    queue, host, param = poller_scenario
+    satellite_api = host.run.satellite_api
+    satellite_api.responses = [param.api_output for _x in param.api_requests]
+
+    poller = FallbackPoller(host.run, 1)
+    poller.add([host])
+    await poller.wait()
+    assert satellite_api.requests == param.api_requests
+    assert queue.messages == param.queue_messages
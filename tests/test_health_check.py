@@ -1,6 +1,8 @@
 import asyncio
+import json
 import logging
 import pytest
+import time
 
 from receptor_satellite.satellite_api import (
     SatelliteAPI,
@@ -13,7 +15,10 @@ from receptor_satellite.satellite_api import (
     HEALTH_SP_UNKNOWN,
     HEALTH_SP_NO_ANSIBLE,
     HEALTH_SP_OFFLINE,
+    health_check_cache,
 )
+from receptor_satellite.capabilities import Capabilities
+from receptor_satellite.metrics import metrics
 from constants import *  # noqa: F403
 
 
@@ -94,8 +99,10 @@ class FakeSatelliteAPI(SatelliteAPI):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.response_map = {}
+        self.requests = []
 
-    async def request(self, method, url, extra_data):
+    async def exchange(self, method, url, extra_data):
+        self.requests.append(url)
         to_return = self.response_map.get(
             url, dict(error="Not found", body="{}", status=404)
         )
@@ -113,9 +120,95 @@ def scenario(request):
 
 def test_health_check(scenario):
     status_code, uuid, api = scenario
+    health_check_cache.clear()
     loop = asyncio.new_event_loop()
     response = loop.run_until_complete(api.health_check(uuid))
     status_result = HEALTH_STATUS_RESULTS[status_code]
     assert response["code"] == status_code
     assert response["fifi_status"] == status_result["fifi_status"]
     assert response["result"] == status_result["result"]
+
+
+def healthy_api():
+    api = FakeSatelliteAPI(**PLUGIN_CONFIG)
+    api.response_map = {
+        UUID_URL: dict(error=None, status=200, body=UUID_RESPONSE_BODY),
+        STATUSES_URL: dict(error=None, status=200, body=STATUSES_RESPONSE_BODY),
+    }
+    return api
+
+
+def test_health_check_is_cached():
+    health_check_cache.clear()
+    api = healthy_api()
+    loop = asyncio.new_event_loop()
+    first = loop.run_until_complete(api.health_check(UUID))
+    second = loop.run_until_complete(api.health_check(UUID))
+    assert first["code"] == second["code"] == HEALTH_OK
+    assert not first["cached"] and first["age"] == 0
+    assert second["cached"] and second["age"] >= 0
+    assert set(first["latency"]) == {"settings", "statuses"}
+    assert second["latency"] == first["latency"]
+    assert first["metrics"] == metrics.snapshot()
+    assert api.capabilities.version == "1.24.0 foreman_remote_execution-2.0.6"
+    assert api.requests == [UUID_URL, STATUSES_URL, BATCH_OUTPUTS_URL]
+
+
+def test_concurrent_health_checks_share_probe():
+    health_check_cache.clear()
+    first, second = healthy_api(), healthy_api()
+
+    async def check():
+        return await asyncio.gather(first.health_check(UUID), second.health_check(UUID))
+
+    results = asyncio.new_event_loop().run_until_complete(check())
+    assert [result["code"] for result in results] == [HEALTH_OK, HEALTH_OK]
+    assert len(first.requests) + len(second.requests) == 3
+
+
+def test_probes_are_sent_concurrently():
+    health_check_cache.clear()
+    api = FakeSatelliteAPI(**PLUGIN_CONFIG)
+    api.response_map = {UUID_URL: dict(error=None, status=200, body=UUID_RESPONSE_BODY)}
+    response = asyncio.new_event_loop().run_until_complete(api.health_check(BAD_UUID))
+    # The statuses probe goes out even though the UUID check decides the result
+    assert response["code"] == HEALTH_UUID_MISMATCH
+    assert api.requests == [UUID_URL, STATUSES_URL, BATCH_OUTPUTS_URL]
+
+
+def check_batch_outputs(response):
+    health_check_cache.clear()
+    api = healthy_api()
+    api.capabilities = Capabilities()
+    api.response_map[BATCH_OUTPUTS_URL] = response
+    result = asyncio.new_event_loop().run_until_complete(api.health_check(UUID))
+    assert result["code"] == HEALTH_OK
+    return api.capabilities.batch_outputs
+
+
+def test_batch_outputs_are_probed():
+    # Satellite doesn't know the job invocation, but it knows the route
+    job_missing = json.dumps({"error": {"message": "Resource job_invocation not found"}})
+    route_missing = json.dumps({"error": {"message": "Route overriden by Katello"}})
+    assert check_batch_outputs(dict(error=None, status=404, body=job_missing))
+    assert not check_batch_outputs(dict(error=None, status=404, body=route_missing))
+    # Nothing is learned when the probe itself fails
+    failure = dict(error=None, status=500, body="<html></html>")
+    assert check_batch_outputs(failure) is None
+
+
+class SlowScheduler:
+    async def acquire(self):
+        time.sleep(0.05)
+
+    def release(self):
+        pass
+
+
+def test_latency_leaves_out_scheduler_wait():
+    health_check_cache.clear()
+    api = healthy_api()
+    api.scheduler = SlowScheduler()
+    response = asyncio.new_event_loop().run_until_complete(api.health_check(UUID))
+    assert response["code"] == HEALTH_OK
+    assert all(latency < 50 for latency in response["latency"].values())
@@ -1,4 +1,5 @@
 import pytest
+from receptor_satellite.console_budget import ConsoleBudget
 from receptor_satellite.host import Host  # noqa: E402
 import receptor_satellite.response.constants as constants  # noqa: E402
 import receptor_satellite.response.messages as messages  # noqa: E402
@@ -16,47 +17,169 @@ def test_mark_as_failed(base_scenario):  # noqa: F811
     ]
 
 
-class PollWithRetriesTestCase:
+def test_output_is_released_when_finished(base_scenario):  # noqa: F811
+    queue, logger, satellite_api, run = base_scenario
+    run.config.output_memory_limit = 8
+    host = Host(run, 1, "host1")
+    host.process_outputs({"complete": False, "output": [{"output": "PLAY [all]\n"}]})
+    host.process_outputs(
+        {
+            "complete": True,
+            "output": [{"output": "PLAY [all]\n"}, {"output": "Exit status: 0"}],
+        }
+    )
+    assert host.output.spilled
+    host.done()
+
+    assert len(host.output) == 0
+    assert not host.output.spilled
+    assert queue.messages == [
+        messages.playbook_run_update(
+            host.name, "play_id", "PLAY [all]\nExit status: 0", 0
+        ),
+        messages.playbook_run_finished(
+            host.name, "play_id", constants.HOST_RESULT_SUCCESS, True, 0
+        ),
+    ]
+
+
+def full_output(*texts, complete=False):
+    return {"complete": complete, "output": [{"output": text} for text in texts]}
+
+
+def test_delta_updates(base_scenario):  # noqa: F811
+    queue, logger, satellite_api, run = base_scenario
+    run.config.text_updates = True
+    run.config.text_update_delta = True
+    run.config.text_update_checkpoint = 3
+    host = Host(run, 1, "host1")
+    host.process_outputs(full_output("a"))
+    host.process_outputs(full_output("a", "bé"))
+    host.process_outputs(full_output("a", "bé"))
+    host.process_outputs(full_output("a", "bé", "c"))
+    host.process_outputs(full_output("a", "bé", "c", "d"))
+    # Output that was already sent changed, consumers have to start over
+    host.process_outputs(full_output("XXXXXXXX", "YY"))
+    host.process_outputs(full_output("XXXXXXXX", "YY", "Z"))
+    host.process_outputs(full_output("x", complete=True))
+
+    assert queue.messages == [
+        messages.playbook_run_update(host.name, "play_id", "a", 0, 0, True),
+        messages.playbook_run_update(host.name, "play_id", "bé", 1, 1),
+        messages.playbook_run_update(host.name, "play_id", "c", 2, 4),
+        messages.playbook_run_update(host.name, "play_id", "abécd", 3, 0, True),
+        messages.playbook_run_update(host.name, "play_id", "XXXXXXXXYY", 4, 0, True),
+        messages.playbook_run_update(host.name, "play_id", "Z", 5, 10),
+        messages.playbook_run_update(host.name, "play_id", "x", 6, 0, True),
+    ]
+
+
+def test_truncated_full_updates(base_scenario):  # noqa: F811
+    queue, logger, satellite_api, run = base_scenario
+    run.config.text_updates = True
+    run.console_budget = ConsoleBudget(host_limit=6)
+    host = Host(run, 1, "host1")
+    host.process_outputs(full_output("abc"))
+    host.process_outputs(full_output("abc", "defg"))
+    host.process_outputs(full_output("abc", "defg"))
+    host.process_outputs(full_output("abc", "defg", "Exit status: 0", complete=True))
+    host.done()
+
+    assert queue.messages == [
+        messages.playbook_run_update(host.name, "play_id", "abc", 0),
+        messages.playbook_run_update(
+            host.name, "play_id", "abc\n[... 1 bytes elided ...]\nefg", 1
+        ),
+        messages.playbook_run_update(
+            host.name, "play_id", "abc\n[... 15 bytes elided ...]\n: 0", 2
+        ),
+        messages.playbook_run_finished(
+            host.name, "play_id", constants.HOST_RESULT_SUCCESS, True, 0
+        ),
+    ]
+
+
+def test_truncated_incremental_updates(base_scenario):  # noqa: F811
+    queue, logger, satellite_api, run = base_scenario
+    run.config.text_updates = True
+    run.config.text_update_full = False
+    run.console_budget = ConsoleBudget(host_limit=6)
+    host = Host(run, 1, "host1")
+
+    def poll(timestamp, output, complete=False):
+        host.process_outputs(
+            {
+                "complete": complete,
+                "output": [{"output": output, "timestamp": timestamp}],
+            }
+        )
+
+    poll(1.0, "a")
+    poll(2.0, "bcdef")
+    poll(3.0, "ghi")
+    poll(4.0, "Exit status: 3", complete=True)
+    host.done()
+
+    # Only the head was sent before going over, the tail follows at the end
+    assert queue.messages == [
+        messages.playbook_run_update(host.name, "play_id", "a", 0),
+        messages.playbook_run_update(host.name, "play_id", "bcdef", 1),
+        messages.playbook_run_update(
+            host.name, "play_id", "\n[... 14 bytes elided ...]\n: 3", 2
+        ),
+        messages.playbook_run_finished(
+            host.name, "play_id", constants.HOST_RESULT_FAILURE, True, 3
+        ),
+    ]
+
+
+def test_run_limit_still_sends_the_tail(base_scenario):  # noqa: F811
+    queue, logger, satellite_api, run = base_scenario
+    run.console_budget = ConsoleBudget(run_limit=10, min_cap=16)
+    host1, host2 = Host(run, 1, "host1"), Host(run, 2, "host2")
+    host1.process_outputs(full_output("x" * 40, "Exit status: 0", complete=True))
+    host2.process_outputs(full_output("y" * 40, "Exit status: 1", complete=True))
+
+    assert [message["console"] for message in queue.messages] == [
+        "xxxxxxxx\n[... 38 bytes elided ...]\ntatus: 0",
+        "yyyyyyyy\n[... 38 bytes elided ...]\ntatus: 1",
+    ]
+
+
+class PollTestCase:
     def __init__(
         self,
         host_id=1,
         api_output=None,
-        result=None,
         api_requests=[],
         queue_messages=[],
     ):
         self.host_id = host_id
         self.api_output = api_output
-        self.result = result
         self.api_requests = api_requests
         self.queue_messages = queue_messages
 
 
-POLL_WITH_RETRIES_TEST_CASES = [
-    # Polling loop does not loop if there is no error when talking to
-    # the API
-    PollWithRetriesTestCase(
-        result={"error": None, "key": "value"},
-        api_output={"error": None, "key": "value"},
+POLL_TEST_CASES = [
+    # A single poll processes the output, but does not finish the host until
+    # Satellite says so
+    PollTestCase(
+        api_output={
+            "error": None,
+            "body": {"complete": False, "output": [{"output": "Running"}]},
+        },
         api_requests=[("output", (None, 1, None))],
     ),
-    PollWithRetriesTestCase(
-        result={"error": True},
+    # Errors are left for whoever polls the host to handle
+    PollTestCase(
         api_output={"error": "controlled failure"},
-        api_requests=[("output", (None, 1, None)) for _x in range(5)],
-        queue_messages=[
-            messages.playbook_run_update("host1", "play_id", "controlled failure", 0),
-            messages.playbook_run_finished(
-                "host1", "play_id", constants.RESULT_FAILURE
-            ),
-        ],
+        api_requests=[("output", (None, 1, None))],
     ),
 ]
 
 
-@pytest.fixture(params=POLL_WITH_RETRIES_TEST_CASES)
-def poll_with_retries_scenario(request, base_scenario):  # noqa: F811
-    # host_id, output_value, result, api_requests, queue_messages = request.param
+@pytest.fixture(params=POLL_TEST_CASES)
+def poll_scenario(request, base_scenario):  # noqa: F811
     param = request.param
     queue, logger, satellite_api, run = base_scenario
     host = Host(run, param.host_id, "host1")
@@ -65,142 +188,18 @@ def poll_with_retries_scenario(request, base_scenario):  # noqa: F811
 
 
 @pytest.mark.asyncio
-async def test_poll_with_retries(poll_with_retries_scenario):
+async def test_poll(poll_scenario):
     (
         queue,
         host,
         param,
-    ) = poll_with_retries_scenario
+    ) = poll_scenario
     satellite_api = host.run.satellite_api
-    satellite_api.responses = [
-        param.api_output for _x in range(len(param.api_requests))
-    ]
-
-    result = await host.poll_with_retries()
-
-    assert result == param.result
-    assert satellite_api.requests == param.api_requests
-    assert queue.messages == param.queue_messages
-
+    satellite_api.responses = [param.api_output]
 
-class PollingLoopTestCase(PollWithRetriesTestCase):
-    def __init__(self, cancelled=False, **kwargs):
-        super().__init__(**kwargs)
-        self.cancelled = cancelled
-
-
-POLLING_LOOP_TEST_CASES = [
-    # If the host doesn't have an ID, it is assumed to be not known by
-    # Satellite and is marked as failed
-    PollingLoopTestCase(
-        host_id=None,
-        queue_messages=[
-            messages.playbook_run_update(
-                "host1", "play_id", "This host is not known by Satellite", 0
-            ),
-            messages.playbook_run_finished(
-                "host1", "play_id", constants.RESULT_FAILURE
-            ),
-        ],
-    ),
-    # If the polling loop receives an error from the API, it marks the
-    # host as failed
-    PollingLoopTestCase(
-        api_output={"error": "controlled failure"},
-        api_requests=[("output", (None, 1, None)) for _x in range(5)],
-        queue_messages=[
-            messages.playbook_run_update("host1", "play_id", "controlled failure", 0),
-            messages.playbook_run_finished(
-                "host1", "play_id", constants.RESULT_FAILURE
-            ),
-        ],
-    ),
-    # If the last output from the API ends with Exit status: 0, mark
-    # the run on the host as success
-    PollingLoopTestCase(
-        api_output={
-            "error": None,
-            "body": {"complete": True, "output": [{"output": "Exit status: 0"}]},
-        },
-        api_requests=[("output", (None, 1, None))],
-        queue_messages=[
-            messages.playbook_run_update("host1", "play_id", "Exit status: 0", 0),
-            messages.playbook_run_finished(
-                "host1", "play_id", constants.RESULT_SUCCESS
-            ),
-        ],
-    ),
-    # If the run was cancelled, but the host managed to finish
-    # successfully, mark it as success
-    PollingLoopTestCase(
-        cancelled=True,
-        api_output={
-            "error": None,
-            "body": {"complete": True, "output": [{"output": "Exit status: 0"}]},
-        },
-        api_requests=[("output", (None, 1, None))],
-        queue_messages=[
-            messages.playbook_run_update("host1", "play_id", "Exit status: 0", 0),
-            messages.playbook_run_finished(
-                "host1", "play_id", constants.RESULT_SUCCESS
-            ),
-        ],
-    ),
-    # If the host failed, mark it as failed
-    PollingLoopTestCase(
-        api_output={
-            "error": None,
-            "body": {"complete": True, "output": [{"output": "Exit status: 123"}]},
-        },
-        api_requests=[("output", (None, 1, None))],
-        queue_messages=[
-            messages.playbook_run_update("host1", "play_id", "Exit status: 123", 0),
-            messages.playbook_run_finished(
-                "host1", "play_id", constants.RESULT_FAILURE, True, 123
-            ),
-        ],
-    ),
-    # If the run was cancelled and the run on the host failed, mark it
-    # as cancelled
-    PollingLoopTestCase(
-        cancelled=True,
-        api_output={
-            "error": None,
-            "body": {"complete": True, "output": [{"output": "Exit status: 123"}]},
-        },
-        api_requests=[("output", (None, 1, None))],
-        queue_messages=[
-            messages.playbook_run_update("host1", "play_id", "Exit status: 123", 0),
-            messages.playbook_run_finished(
-                "host1", "play_id", constants.RESULT_CANCEL, True, 123
-            ),
-        ],
-    ),
-]
-
-
-@pytest.fixture(params=POLLING_LOOP_TEST_CASES)
-def polling_loop_scenario(request, base_scenario):  # noqa: F811
-    queue, logger, satellite_api, run = base_scenario
-    run.cancelled = request.param.cancelled
-    host = Host(run, request.param.host_id, "host1")
-
-    yield (queue, host, request.param)
-
-
-@pytest.mark.asyncio
-async def test_polling_loop(polling_loop_scenario):
-    (
-        queue,
-        host,
-        param,
-    ) = polling_loop_scenario
-    satellite_api = host.run.satellite_api
-    satellite_api.responses = [
-        param.api_output for _x in range(len(param.api_requests))
-    ]
+    result = await host.poll()
 
-    result = await host.polling_loop()
-    assert result == param.result
+    assert result == param.api_output
+    assert host.result is None
     assert satellite_api.requests == param.api_requests
     assert queue.messages == param.queue_messages
@@ -0,0 +1,89 @@
+import asyncio
+import os
+import pytest
+
+from receptor_satellite.host_cache import HostCache, MISSING
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire():
+    clock = FakeClock()
+    cache = HostCache(ttl=10, missing_ttl=5, clock=clock)
+    cache.remember("host1", 5)
+    cache.remember_missing("host2")
+    assert cache.get("host1") == 5
+    assert cache.get("host2") is MISSING
+    assert cache.get("host3") is None
+
+    clock.now += 5
+    assert cache.get("host1") == 5
+    assert cache.get("host2") is None
+
+    clock.now += 5
+    assert cache.get("host1") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = HostCache(max_size=2)
+    cache.remember("host1", 1)
+    cache.remember("host2", 2)
+    cache.get("host1")
+    cache.remember("host3", 3)
+    assert cache.get("host1") == 1
+    assert cache.get("host2") is None
+    assert cache.get("host3") == 3
+
+
+def test_persistence(tmp_path):
+    path = str(tmp_path / "hosts.json")
+    cache = HostCache("http://satellite", path)
+    cache.remember("host1", 1)
+    cache.remember_missing("host2")
+    cache.save()
+
+    assert HostCache("http://satellite", path).get("host1") == 1
+    assert HostCache("http://satellite", path).get("host2") is MISSING
+    assert HostCache("http://elsewhere", path).get("host1") is None
+
+
+def test_unchanged_cache_is_not_saved(tmp_path):
+    path = str(tmp_path / "hosts.json")
+    cache = HostCache("http://satellite", path)
+    cache.save()
+    assert not os.path.exists(path)
+
+    cache.remember("host1", 1)
+    cache.save()
+    os.remove(path)
+    cache.get("host1")
+    cache.forget("host2")
+    cache.save()
+    assert not os.path.exists(path)
+
+    cache.forget("host1")
+    cache.save()
+    assert HostCache("http://satellite", path).get("host1") is None
+
+
+@pytest.mark.asyncio
+async def test_saving_on_loop_writes_in_executor(tmp_path):
+    path = str(tmp_path / "hosts.json")
+    cache = HostCache("http://satellite", path)
+    cache.remember("host1", 1)
+    first = cache.save()
+    cache.remember("host2", 2)
+    second = cache.save()
+    assert cache.save() is None
+    await asyncio.gather(first, second)
+
+    restored = HostCache("http://satellite", path)
+    assert restored.get("host1") == 1
+    assert restored.get("host2") == 2
@@ -0,0 +1,24 @@
+from receptor_satellite.host import Host
+from receptor_satellite.host_table import HostTable
+from test_helper import base_scenario  # noqa: F401
+
+
+def test_host_table(base_scenario):  # noqa: F811
+    queue, logger, satellite_api, run = base_scenario
+    hosts = [Host(run, None, name) for name in ["a", "b", "a"]]
+    table = HostTable(hosts)
+
+    assert list(table) == hosts
+    assert len(table) == 3
+    assert table[1:] == hosts[1:]
+    assert table.named("b") is hosts[1]
+    assert table.named("a") is hosts[2]
+    assert table.named("c") is None
+
+
+def test_hosts_are_compact(base_scenario):  # noqa: F811
+    queue, logger, satellite_api, run = base_scenario
+    host = Host(run, None, "a")
+    assert not hasattr(host, "__dict__")
+    assert not hasattr(host.output, "__dict__")
+    assert not hasattr(host.scanner, "__dict__")
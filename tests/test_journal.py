@@ -0,0 +1,147 @@
+import asyncio
+import json
+import os
+import types
+
+from receptor_satellite.journal import Journal
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRun:
+    def __init__(self, playbook_run_id):
+        self.playbook_run_id = playbook_run_id
+
+
+class FakeHost:
+    def __init__(self, name, id, sequence=0, since=0.0):
+        self.name = name
+        self.id = id
+        self.sequence = sequence
+        self.sent_since = since
+        self.result = None
+        self.unreachable = None
+
+
+# Lets other tasks run, asyncio.sleep(0) is patched out by test_helper
+@types.coroutine
+def yield_to_loop():
+    yield
+
+
+def read_records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_unfinished_runs_are_resumable(tmp_path):
+    path = str(tmp_path / "journal")
+    clock = FakeClock()
+    journal = Journal(path, clock=clock)
+    run = FakeRun("play_id")
+    host1, host2 = FakeHost("host1", 5), FakeHost("host2", 6)
+    journal.triggered(run, 123, [host1, host2])
+    host1.sequence, host1.sent_since = 2, 1.5
+    journal.progress(run, [host1])
+    host2.result = "success"
+    journal.done(run, [host2])
+    journal.triggered(FakeRun("other_id"), 124, [FakeHost("host3", 7)])
+    journal.finished(FakeRun("other_id"))
+
+    journal = Journal(path, clock=clock)
+    assert journal.resumable("play_id") == dict(
+        running={"host1": [5, 123, 2, 1.5]},
+        done={"host2": ["success", None]},
+        time=1000.0,
+    )
+    assert journal.resumable("play_id") is None
+    assert journal.resumable("other_id") is None
+
+
+def test_journal_is_compacted_on_load(tmp_path):
+    path = str(tmp_path / "journal")
+    journal = Journal(path)
+    run = FakeRun("play_id")
+    host = FakeHost("host1", 5)
+    journal.triggered(run, 123, [host])
+    for sequence in range(1, 10):
+        host.sequence = sequence
+        journal.progress(run, [host])
+    journal.triggered(FakeRun("other_id"), 124, [FakeHost("host3", 7)])
+    journal.finished(FakeRun("other_id"))
+
+    Journal(path)
+    records = read_records(path)
+    assert len(records) == 1
+    assert records[0]["event"] == "snapshot"
+    assert records[0]["state"]["running"] == {"host1": [5, 123, 9, 0.0]}
+
+
+def test_incomplete_and_stale_records_are_skipped(tmp_path):
+    path = str(tmp_path / "journal")
+    clock = FakeClock()
+    journal = Journal(path, max_age=60, clock=clock)
+    journal.triggered(FakeRun("old_id"), 123, [FakeHost("host1", 5)])
+    clock.now += 30
+    journal.triggered(FakeRun("play_id"), 124, [FakeHost("host2", 6)])
+    with open(path, "a") as f:
+        f.write('{"run": "play_id", "event": "do')
+
+    clock.now += 31
+    journal = Journal(path, max_age=60, clock=clock)
+    assert journal.resumable("old_id") is None
+    assert journal.resumable("play_id")["running"] == {"host2": [6, 124, 0, 0.0]}
+
+
+def test_journal_without_path_records_nothing(tmp_path):
+    journal = Journal()
+    journal.triggered(FakeRun("play_id"), 123, [FakeHost("host1", 5)])
+    assert journal.resumable("play_id") is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_journal_is_emptied_once_runs_finish(tmp_path):
+    path = str(tmp_path / "journal")
+    journal = Journal(path)
+    run = FakeRun("play_id")
+    journal.triggered(run, 123, [FakeHost("host1", 5)])
+    journal.finished(run)
+    assert read_records(path) == []
+
+
+def test_journal_is_compacted_past_threshold(tmp_path):
+    path = str(tmp_path / "journal")
+    journal = Journal(path, compact_after=5)
+    run = FakeRun("play_id")
+    host = FakeHost("host1", 5)
+    journal.triggered(run, 123, [host])
+    for sequence in range(1, 10):
+        host.sequence = sequence
+        journal.progress(run, [host])
+
+    records = read_records(path)
+    assert len(records) < 5
+    assert records[0]["event"] == "snapshot"
+    assert Journal(path).resumable("play_id")["running"] == {"host1": [5, 123, 9, 0.0]}
+
+
+def test_records_are_written_together(tmp_path):
+    path = str(tmp_path / "journal")
+    journal = Journal(path)
+    run = FakeRun("play_id")
+
+    async def record():
+        journal.triggered(run, 123, [FakeHost("host1", 5)])
+        journal.progress(run, [FakeHost("host1", 5, sequence=1)])
+        assert not os.path.exists(path) or read_records(path) == []
+        await yield_to_loop()
+        return read_records(path)
+
+    records = asyncio.new_event_loop().run_until_complete(record())
+    assert [record["event"] for record in records] == ["trigger", "progress"]
@@ -0,0 +1,48 @@
+import json
+import pytest
+
+from receptor_satellite.json_stream import ArrayItemDecoder
+
+OUTPUTS = [
+    {
+        "host_id": 1,
+        "complete": False,
+        "output": [{"output": 'quoted "outputs": [1] \\ and ] brackets {', "t": 1.5}],
+    },
+    {"host_id": 2, "complete": True, "output": [{"output": "é☃\n"}]},
+    {"host_id": 3, "complete": True, "output": []},
+]
+
+DOCUMENTS = [
+    json.dumps({"outputs": OUTPUTS}),
+    json.dumps(
+        {"first": "outputs", "nested": {"outputs": [{"x": 1}]}, "outputs": OUTPUTS}
+    ),
+    json.dumps({'a"b\\': ["outputs"], "outputs": OUTPUTS, "after": [{"y": 2}]}),
+]
+
+
+def decode(document, chunk_size):
+    decoder = ArrayItemDecoder("outputs")
+    data = document.encode("utf-8")
+    items = []
+    for start in range(0, len(data), chunk_size):
+        items.extend(decoder.feed(data[start : start + chunk_size]))
+    decoder.close()
+    return items
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 100000])
+def test_decodes_items_across_chunk_boundaries(document, chunk_size):
+    assert decode(document, chunk_size) == OUTPUTS
+
+
+def test_missing_key_yields_nothing():
+    assert decode(json.dumps({"error": {"message": "Not found"}}), 5) == []
+
+
+def test_truncated_document_raises():
+    document = json.dumps({"outputs": OUTPUTS})
+    with pytest.raises(ValueError):
+        decode(document[:-10], 4)
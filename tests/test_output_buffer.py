@@ -0,0 +1,61 @@
+from receptor_satellite.output_buffer import OutputBuffer
+
+
+def test_output_stays_in_memory_below_limit():
+    buffer = OutputBuffer(16)
+    buffer.append("PLAY ")
+    buffer.append("")
+    buffer.append("[all]")
+    assert not buffer.spilled
+    assert len(buffer) == 10
+    assert buffer.read() == "PLAY [all]"
+
+
+def test_output_spills_past_limit():
+    buffer = OutputBuffer(8)
+    buffer.append("héllo ")
+    buffer.append("wörld")
+    assert buffer.spilled
+    buffer.append("!")
+    assert buffer.read() == "héllo wörld!"
+    assert len(buffer) == 14
+    assert buffer.read(7) == "wörld!"
+
+
+def test_read_from_offset():
+    buffer = OutputBuffer(16)
+    for text in ["ab", "cd", "é"]:
+        buffer.append(text)
+    assert buffer.read(1) == "bcdé"
+    assert buffer.read(4) == "é"
+    assert buffer.read(6) == ""
+
+
+def test_clear_releases_output():
+    buffer = OutputBuffer(4)
+    buffer.append("spilled")
+    buffer.clear()
+    assert not buffer.spilled
+    assert len(buffer) == 0
+    assert not buffer
+    buffer.append("ok")
+    assert buffer.read() == "ok"
+
+
+def test_read_range():
+    for memory_limit in [16, 1]:
+        buffer = OutputBuffer(memory_limit)
+        for text in ["ab", "cd", "é", "xyz"]:
+            buffer.append(text)
+        assert buffer.read(1, 4) == "bcd"
+        # Characters cut in half are left out
+        assert buffer.read(1, 5) == "bcd"
+        assert buffer.read(5) == "xyz"
+
+
+def test_read_elided():
+    buffer = OutputBuffer(16)
+    buffer.append("0123456789")
+    assert buffer.read_elided(3, 2) == "012\n[... 5 bytes elided ...]\n89"
+    assert buffer.read_elided(0, 0) == "\n[... 10 bytes elided ...]\n"
+    assert buffer.read_elided(5, 5) == "0123456789"
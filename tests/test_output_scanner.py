@@ -0,0 +1,61 @@
+from receptor_satellite.output_scanner import EXCEPTION, OutputScanner
+
+RECAP = "host1 : ok=3 changed=0 unreachable=0 failed=0"
+UNREACHABLE_RECAP = "host1 : ok=0 changed=0 unreachable=1 failed=0"
+
+
+def scan(*chunks, hostname="host1", **kwargs):
+    scanner = OutputScanner(hostname, **kwargs)
+    for chunk in chunks:
+        scanner.feed(chunk)
+    scanner.finish()
+    return scanner
+
+
+def test_lines_split_across_chunks():
+    scanner = scan(
+        "PLAY RECAP\nhost1 : o", "k=3 changed=0 unrea", "chable=1\nExit st", "atus: 2\n"
+    )
+    assert scanner.recap_line == "host1 : ok=3 changed=0 unreachable=1"
+    assert scanner.unreachable
+    assert scanner.exit_status == 2
+
+
+def test_recap_without_trailing_newline():
+    scanner = scan("PLAY RECAP\n", UNREACHABLE_RECAP)
+    assert scanner.recap_line == UNREACHABLE_RECAP
+    assert scanner.unreachable
+    assert scanner.exit_status is None
+
+
+def test_latest_recap_and_exit_status_win():
+    scanner = scan(f"{UNREACHABLE_RECAP}\nExit status: 1\n{RECAP}\nExit status: 0\n")
+    assert scanner.recap_line == RECAP
+    assert not scanner.unreachable
+    assert scanner.exit_status == 0
+
+
+def test_exception_exit_status():
+    assert scan("Exit status: EXCEPTION").exit_status == EXCEPTION
+
+
+def test_unrelated_lines_are_ignored():
+    scanner = scan("host2 : ok=1 unreachable=1\nhost1 is ok=\nExit status: \n")
+    assert scanner.recap_line == ""
+    assert scanner.exit_status is None
+
+
+def test_hostname_is_matched_literally():
+    scanner = scan("hostXexample : ok=1 unreachable=1\n", hostname="host.example")
+    assert scanner.recap_line == ""
+    scanner = scan("[host.example] : ok=1 unreachable=1\n", hostname="[host.example]")
+    assert scanner.unreachable
+
+
+def test_tail_is_bounded():
+    scanner = OutputScanner("host1", max_tail=16)
+    scanner.feed("x" * 1000)
+    scanner.feed("x Exit status: 3")
+    assert len(scanner.tail) == 16
+    scanner.finish()
+    assert scanner.exit_status == 3
@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+import types
+
+from receptor_satellite.poll_coordinator import AdaptiveInterval, PollCoordinator
+
+
+# Lets other tasks run, asyncio.sleep(0) may be patched out by other tests
+@types.coroutine
+def yield_to_loop():
+    yield
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.5
+        self.wakeups = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, interval):
+        self.wakeups.append(self.now + interval)
+        await yield_to_loop()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(asyncio, "sleep", clock.sleep)
+    return clock
+
+
+@pytest.mark.asyncio
+async def test_polls_share_a_tick(clock):
+    coordinator = PollCoordinator(clock=clock)
+    await asyncio.gather(*[coordinator.wait(5) for _ in range(3)])
+    assert len(coordinator) == 0
+
+    # Everybody waits for the same tick, then polls in its own slot
+    tick_starts, poll_times = clock.wakeups[:3], clock.wakeups[3:]
+    assert tick_starts == [105, 105, 105]
+    for i, poll_time in enumerate(poll_times):
+        assert 105 + i * 5 / 3 <= poll_time < 105 + (i + 1) * 5 / 3
+
+
+@pytest.mark.asyncio
+async def test_late_polls_join_next_tick(clock):
+    coordinator = PollCoordinator(clock=clock)
+    await coordinator.wait(5)
+    clock.now = 105.0
+    await coordinator.wait(5)
+    assert clock.wakeups[0] == 105
+    assert clock.wakeups[2] == 110
+
+
+def test_adaptive_interval():
+    interval = AdaptiveInterval(5, 1, 30)
+    assert interval.current == 5
+    for expected in [10, 20, 30, 30]:
+        interval.update(False)
+        assert interval.current == expected
+    for expected in [20, 10, 5, 2.5, 1.25, 1, 1]:
+        interval.update(True)
+        assert interval.current == expected
+
+
+def test_fixed_interval():
+    interval = AdaptiveInterval(5, 5, 5)
+    interval.update(False)
+    assert interval.current == 5
+    interval.update(True)
+    assert interval.current == 5
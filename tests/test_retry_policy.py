@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+
+from receptor_satellite.retry_policy import CircuitBreaker, RetryPolicy, guarded
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_first_attempt_keeps_interval():
+    assert RetryPolicy(5).delay(0) == 5
+
+
+def test_retries_back_off_with_jitter():
+    policy = RetryPolicy(5, max_delay=30)
+    for attempt in range(1, 10):
+        delay = policy.delay(attempt)
+        assert 0 <= delay <= min(30, 5 * 2**attempt)
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_and_probes_once():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+
+    async def failure():
+        return dict(error="Bad gateway", status=502)
+
+    async def success():
+        return dict(error=None, status=200)
+
+    await guarded(breaker, failure)
+    assert breaker.state == CircuitBreaker.CLOSED
+    await guarded(breaker, failure)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now += 10
+    await breaker.wait()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    # Other pollers wait for the probe to finish instead of sending requests
+    waiter = asyncio.ensure_future(breaker.wait())
+    await asyncio.wait([waiter], timeout=0.01)
+    assert not waiter.done()
+
+    breaker.record_success()
+    await waiter
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_client_errors_do_not_trip_breaker():
+    breaker = CircuitBreaker(failure_threshold=1)
+
+    async def not_found():
+        return dict(error="Not found", status=404)
+
+    await guarded(breaker, not_found)
+    assert breaker.state == CircuitBreaker.CLOSED
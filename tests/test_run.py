@@ -1,4 +1,6 @@
+import asyncio
 import pytest
+import types
 
 from test_helper import base_scenario  # noqa: F401
 from receptor_satellite.run_monitor import run_monitor  # noqa: E402
@@ -8,8 +10,20 @@ import receptor_satellite.response.constants as constants  # noqa: E402
 import receptor_satellite.response.messages as messages  # noqa: E402
 from fake_logger import FakeLogger  # noqa: E402
 from fake_queue import FakeQueue  # noqa: E402
+from fake_satellite_api import FakeSatelliteAPI  # noqa: E402
 
-from receptor_satellite import playbook_verifier_adapter
+from receptor_satellite import playbook_verifier_adapter, worker
+from receptor_satellite.journal import Journal
+from receptor_satellite.metrics import (
+    metrics,
+    HOSTS_RUN_TIMEOUT,
+    HOSTS_STALLED,
+    HOSTS_TIMED_OUT,
+    RUNS_TIMED_OUT,
+)
+from receptor_satellite.satellite_api import StreamError
+from receptor_satellite.scheduler import RequestScheduler
+from receptor_satellite.shard import split_into_shards
 
 
 def test_hostname_sanity():
@@ -26,7 +40,7 @@ def test_hostname_sanity():
         hosts,
         "playbook",
         {},
-        None,  # No need for SatelliteAPI in this test
+        FakeSatelliteAPI(),
         logger,
     )
     assert logger.warnings() == [
@@ -371,7 +385,7 @@ def __fail_verification(_):
 
 @pytest.mark.asyncio
 async def test_run(run_scenario):
-    run_monitor._RunMonitor__runs = {}
+    run_monitor.clear()
     base, case = run_scenario
     queue, logger, satellite_api, run = base
     (
@@ -395,3 +409,801 @@ async def test_run(run_scenario):
     assert logger.messages == expected_logger_messages
     assert queue.messages == expected_queue_messages
     playbook_verifier_adapter.verify = old_verifier
+
+
+async def __broken_stream():
+    raise StreamError("connection reset")
+    yield
+
+
+@pytest.mark.asyncio
+async def test_stream_error_is_retried(base_scenario):  # noqa: F811
+    queue, logger, satellite_api, run = base_scenario
+    run.update_hosts([{"name": "host1", "id": 5}], 123)
+    satellite_api.responses = [
+        dict(error=None, status=200, body={"outputs": __broken_stream()}),
+        dict(
+            error=None,
+            status=200,
+            body={
+                "outputs": [
+                    {
+                        "host_id": 5,
+                        "output": [{"output": "Exit status: 0"}],
+                        "complete": True,
+                    }
+                ]
+            },
+        ),
+    ]
+    assert await run.polling_loop()
+    assert satellite_api.requests == [("outputs", (123, [5], None))] * 2
+    assert queue.messages == [
+        messages.playbook_run_update("host1", "play_id", "Exit status: 0", 0),
+        messages.playbook_run_finished("host1", "play_id", constants.RESULT_SUCCESS),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_incremental_polling():
+    queue = FakeQueue()
+    satellite_api = FakeSatelliteAPI()
+    run = Run(
+        ResponseQueue(queue),
+        "rem_id",
+        "play_id",
+        "account_no",
+        ["host1", "host2"],
+        "playbook",
+        {"text_updates": True, "text_update_full": False},
+        satellite_api,
+        FakeLogger(),
+    )
+    run.update_hosts([{"name": "host1", "id": 5}, {"name": "host2", "id": 6}], 123)
+
+    def chunk(output, timestamp):
+        return {"output": output, "output_type": "stdout", "timestamp": timestamp}
+
+    satellite_api.responses = [
+        dict(
+            error=None,
+            body={
+                "outputs": [
+                    {
+                        "host_id": 5,
+                        "output": [chunk("a", 1.0), chunk("b", 2.0)],
+                        "complete": False,
+                    },
+                    {"host_id": 6, "output": [chunk("x", 1.5)], "complete": False},
+                ]
+            },
+        ),
+        dict(
+            error=None,
+            body={
+                "outputs": [
+                    {
+                        "host_id": 5,
+                        "output": [
+                            chunk("b", 2.0),
+                            chunk("b", 2.0),
+                            chunk("Exit status: 0", 3.0),
+                        ],
+                        "complete": True,
+                    },
+                    {"host_id": 6, "output": [chunk("y", 2.5)], "complete": False},
+                ]
+            },
+        ),
+        dict(
+            error=None,
+            body={
+                "outputs": [
+                    {
+                        "host_id": 6,
+                        "output": [chunk("Exit status: 0", 4.0)],
+                        "complete": True,
+                    }
+                ]
+            },
+        ),
+    ]
+    assert await run.polling_loop()
+    assert satellite_api.requests == [
+        ("outputs", (123, [5, 6], 0.0)),
+        ("outputs", (123, [5, 6], 2.0)),
+        ("outputs", (123, [6], 3.0)),
+    ]
+    assert queue.messages == [
+        messages.playbook_run_update("host1", "play_id", "ab", 0),
+        messages.playbook_run_update("host2", "play_id", "x", 0),
+        messages.playbook_run_update("host1", "play_id", "bExit status: 0", 1),
+        messages.playbook_run_finished("host1", "play_id", constants.RESULT_SUCCESS),
+        messages.playbook_run_update("host2", "play_id", "y", 1),
+        messages.playbook_run_update("host2", "play_id", "Exit status: 0", 2),
+        messages.playbook_run_finished("host2", "play_id", constants.RESULT_SUCCESS),
+    ]
+
+
+def completed_output(host_id, complete=True):
+    return {
+        "host_id": host_id,
+        "output": [{"output": "Exit status: 0"}],
+        "complete": complete,
+    }
+
+
+@pytest.mark.asyncio
+async def test_idle_hosts_do_not_hold_back_the_cursor():
+    queue = FakeQueue()
+    satellite_api = FakeSatelliteAPI()
+    run = Run(
+        ResponseQueue(queue),
+        "rem_id",
+        "play_id",
+        "account_no",
+        ["host1", "host2"],
+        "playbook",
+        {"text_update_full": False},
+        satellite_api,
+        FakeLogger(),
+    )
+    run.update_hosts([{"name": "host1", "id": 5}, {"name": "host2", "id": 6}], 123)
+    satellite_api.responses = [
+        dict(error=None, body={"outputs": [host_chunk(5, "a", 1.0)]}),
+        dict(error=None, body={"outputs": [host_chunk(5, "b", 5.0)]}),
+        dict(
+            error=None,
+            body={
+                "outputs": [
+                    host_chunk(5, "Exit status: 0", 6.0, True),
+                    host_chunk(6, "Exit status: 0", 7.0, True),
+                ]
+            },
+        ),
+    ]
+    assert await run.polling_loop()
+    # host2 stays at its initial cursor, the shard's moves on with host1
+    assert satellite_api.requests == [
+        ("outputs", (123, [5, 6], 0.0)),
+        ("outputs", (123, [5, 6], 1.0)),
+        ("outputs", (123, [5, 6], 5.0)),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_cursor_stays_when_stream_breaks():
+    satellite_api = FakeSatelliteAPI()
+    run = Run(
+        ResponseQueue(FakeQueue()),
+        "rem_id",
+        "play_id",
+        "account_no",
+        ["host1", "host2"],
+        "playbook",
+        {"text_update_full": False},
+        satellite_api,
+        FakeLogger(),
+    )
+    run.update_hosts([{"name": "host1", "id": 5}, {"name": "host2", "id": 6}], 123)
+    shard = split_into_shards(123, list(run.running.values()), 10)[0]
+
+    async def broken():
+        yield host_chunk(5, "a", 5.0)
+        raise StreamError("controlled failure")
+
+    with pytest.raises(StreamError):
+        await run.process_outputs(shard, broken())
+    # host2's output older than 5.0 may still be coming
+    assert shard.since == 0.0
+
+
+@pytest.mark.asyncio
+async def test_sharded_polling():
+    queue = FakeQueue()
+    satellite_api = FakeSatelliteAPI()
+    run = Run(
+        ResponseQueue(queue),
+        "rem_id",
+        "play_id",
+        "account_no",
+        ["host1", "host2", "host3"],
+        "playbook",
+        {"poll_shard_size": 2, "poll_concurrency": 2},
+        satellite_api,
+        FakeLogger(),
+    )
+    run.update_hosts(
+        [
+            {"name": "host1", "id": 5},
+            {"name": "host2", "id": 6},
+            {"name": "host3", "id": 7},
+        ],
+        123,
+    )
+    satellite_api.responses = [
+        dict(error=None, body={"outputs": [completed_output(5)]}),
+        dict(error=None, body={"outputs": [completed_output(7)]}),
+        dict(error=None, body={"outputs": [completed_output(6)]}),
+    ]
+    assert await run.polling_loop()
+    assert satellite_api.requests == [
+        ("outputs", (123, [5, 6], None)),
+        ("outputs", (123, [7], None)),
+        ("outputs", (123, [6], None)),
+    ]
+    assert run.running == {}
+    assert run.shards == []
+
+
+@pytest.mark.asyncio
+async def test_batched_trigger():
+    run_monitor.clear()
+    queue = FakeQueue()
+    satellite_api = FakeSatelliteAPI()
+    run = Run(
+        ResponseQueue(queue),
+        "rem_id",
+        "play_id",
+        "account_no",
+        ["host1", "host2", "host3"],
+        "playbook",
+        {"trigger_batch_size": 2},
+        satellite_api,
+        FakeLogger(),
+    )
+    satellite_api.responses = [
+        dict(
+            error=None,
+            body={
+                "id": 123,
+                "targeting": {
+                    "hosts": [{"name": "host1", "id": 5}, {"name": "host2", "id": 6}]
+                },
+            },
+        ),
+        dict(error="Timed out"),
+        dict(error=None, body={"outputs": [completed_output(5), completed_output(6)]}),
+    ]
+    old_verifier = playbook_verifier_adapter.verify
+    playbook_verifier_adapter.verify = lambda x: x
+    await run.run()
+    playbook_verifier_adapter.verify = old_verifier
+
+    assert run.job_invocation_ids == [123]
+    assert satellite_api.requests == [
+        ("trigger", ({"playbook": "playbook"}, ["host1", "host2"])),
+        ("trigger", ({"playbook": "playbook"}, ["host3"])),
+        ("outputs", (123, [5, 6], None)),
+    ]
+    assert queue.messages == [
+        messages.ack("play_id"),
+        messages.playbook_run_update("host3", "play_id", "Timed out", 0),
+        messages.playbook_run_finished(
+            "host3", "play_id", constants.RESULT_FAILURE, None
+        ),
+        messages.playbook_run_update("host1", "play_id", "Exit status: 0", 0),
+        messages.playbook_run_finished("host1", "play_id", constants.RESULT_SUCCESS),
+        messages.playbook_run_update("host2", "play_id", "Exit status: 0", 0),
+        messages.playbook_run_finished("host2", "play_id", constants.RESULT_SUCCESS),
+        messages.playbook_run_completed("play_id", constants.RESULT_FAILURE),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_trigger_uses_cached_host_ids():
+    queue = FakeQueue()
+    satellite_api = FakeSatelliteAPI()
+    satellite_api.host_cache.remember("host1", 5)
+    satellite_api.host_cache.remember("host2", 6)
+    satellite_api.host_cache.remember_missing("host3")
+    run = Run(
+        ResponseQueue(queue),
+        "rem_id",
+        "play_id",
+        "account_no",
+        ["host1", "host2", "host3", "host4"],
+        "playbook",
+        {},
+        satellite_api,
+        FakeLogger(),
+    )
+    satellite_api.responses = [
+        dict(
+            error=None,
+            body={
+                "id": 123,
+                "targeting": {
+                    "hosts": [{"name": "host1", "id": 5}, {"name": "host4", "id": 8}]
+                },
+            },
+        ),
+        # host2 got a new ID in Satellite
+        dict(
+            error=None,
+            body={"id": 124, "targeting": {"hosts": [{"name": "host2", "id": 7}]}},
+        ),
+    ]
+    assert await run.trigger(run.hosts)
+    assert satellite_api.requests == [
+        ("trigger", ({"playbook": "playbook"}, ["host4"], [5, 6])),
+        ("trigger", ({"playbook": "playbook"}, ["host2"])),
+    ]
+    assert run.job_invocation_ids == [123, 124]
+    assert sorted(run.running) == [5, 7, 8]
+    assert queue.messages == [
+        messages.playbook_run_update(
+            "host3", "play_id", "This host is not known by Satellite", 0
+        ),
+        messages.playbook_run_finished(
+            "host3", "play_id", constants.RESULT_FAILURE, None
+        ),
+    ]
+    assert satellite_api.host_cache.get("host2") == 7
+    assert satellite_api.host_cache.get("host4") == 8
+
+
+@pytest.mark.asyncio
+async def test_resume_from_journal(tmp_path):
+    run_monitor.clear()
+    path = str(tmp_path / "journal")
+    queue = FakeQueue()
+    satellite_api = FakeSatelliteAPI()
+    satellite_api.journal = Journal(path)
+    run = Run(
+        ResponseQueue(queue),
+        "rem_id",
+        "play_id",
+        "account_no",
+        ["host1", "host2"],
+        "playbook",
+        {"text_updates": True},
+        satellite_api,
+        FakeLogger(),
+    )
+    satellite_api.responses = [
+        dict(
+            error=None,
+            body={
+                "id": 123,
+                "targeting": {
+                    "hosts": [{"name": "host1", "id": 5}, {"name": "host2", "id": 6}]
+                },
+            },
+        ),
+        dict(
+            error=None,
+            body={
+                "outputs": [
+                    completed_output(5),
+                    {"host_id": 6, "output": [{"output": "x"}], "complete": False},
+                ]
+            },
+        ),
+    ]
+    assert await run.trigger(run.hosts)
+    shard = run.shards = split_into_shards(123, list(run.running.values()), 10)
+    response = await satellite_api.outputs(123, [5, 6], None)
+    await run.process_outputs(shard[0], response["body"]["outputs"])
+    satellite_api.journal.flush()
+
+    # The worker restarts and the run is dispatched again
+    queue = FakeQueue()
+    satellite_api = FakeSatelliteAPI()
+    satellite_api.journal = Journal(path)
+    run = Run(
+        ResponseQueue(queue),
+        "rem_id",
+        "play_id",
+        "account_no",
+        ["host1", "host2"],
+        "playbook",
+        {"text_updates": True},
+        satellite_api,
+        FakeLogger(),
+    )
+    satellite_api.responses = [
+        dict(error=None, body={"outputs": [completed_output(6)]}),
+    ]
+    old_verifier = playbook_verifier_adapter.verify
+    playbook_verifier_adapter.verify = lambda x: x
+    await run.run()
+    playbook_verifier_adapter.verify = old_verifier
+
+    assert run.job_invocation_ids == [123]
+    assert satellite_api.requests == [("outputs", (123, [6], None))]
+    assert queue.messages == [
+        messages.ack("play_id"),
+        messages.playbook_run_update("host2", "play_id", "Exit status: 0", 1),
+        messages.playbook_run_finished("host2", "play_id", constants.RESULT_SUCCESS),
+        messages.playbook_run_completed("play_id", constants.RESULT_SUCCESS),
+    ]
+    assert Journal(path).resumable("play_id") is None
+
+
+@pytest.mark.asyncio
+async def test_cancel_interrupts_sleep():
+    run = Run(
+        ResponseQueue(FakeQueue()),
+        "rem_id",
+        "play_id",
+        "account_no",
+        ["host1"],
+        "playbook",
+        {},
+        FakeSatelliteAPI(),
+        FakeLogger(),
+    )
+    asyncio.get_event_loop().call_soon(run.cancel)
+    await asyncio.wait_for(run.interruptible(asyncio.Event().wait()), 1)
+    assert run.cancelled
+
+
+@pytest.mark.asyncio
+async def test_cancel_run_polls_once_more():
+    run_monitor.clear()
+    queue = FakeQueue()
+    satellite_api = FakeSatelliteAPI()
+    run = Run(
+        ResponseQueue(queue),
+        "rem_id",
+        "play_id",
+        "account_no",
+        ["host1", "host2"],
+        "playbook",
+        {},
+        satellite_api,
+        FakeLogger(),
+    )
+    await run_monitor.register(run)
+    run.job_invocation_ids = [123]
+    run.update_hosts([{"name": "host1", "id": 5}, {"name": "host2", "id": 6}], 123)
+    satellite_api.responses = [
+        dict(error=None, status=200, body="{}"),
+        dict(
+            error=None,
+            body={
+                "outputs": [
+                    completed_output(5),
+                    {"host_id": 6, "output": [{"output": "x"}], "complete": False},
+                ]
+            },
+        ),
+    ]
+    await worker.cancel_run("play_id", ResponseQueue(queue), FakeLogger())
+    assert await run.polling_loop()
+    assert satellite_api.requests == [
+        ("cancel", 123),
+        ("outputs", (123, [5, 6], None)),
+    ]
+    assert run.running == {}
+    assert queue.messages == [
+        messages.playbook_run_cancel_ack("play_id", constants.CANCEL_RESULT_CANCELLING),
+        messages.playbook_run_update("host1", "play_id", "Exit status: 0", 0),
+        messages.playbook_run_finished("host1", "play_id", constants.RESULT_SUCCESS),
+        messages.playbook_run_update("host2", "play_id", "x", 0),
+        messages.playbook_run_finished(
+            "host2", "play_id", constants.RESULT_CANCEL, True, None
+        ),
+    ]
+
+
+CANCELLED = "Playbook run was cancelled"
+
+
+class CancellingSatelliteAPI(FakeSatelliteAPI):
+    def __init__(self):
+        super().__init__()
+        self.run = None
+
+    async def trigger(self, inputs, hosts, host_ids=None):
+        response = await super().trigger(inputs, hosts, host_ids)
+        self.run.cancel()
+        return response
+
+
+@pytest.mark.asyncio
+async def test_cancel_stops_pending_batches():
+    queue = FakeQueue()
+    satellite_api = CancellingSatelliteAPI()
+    run = Run(
+        ResponseQueue(queue),
+        "rem_id",
+        "play_id",
+        "account_no",
+        ["host1", "host2", "host3"],
+        "playbook",
+        {"trigger_batch_size": 1, "trigger_concurrency": 1},
+        satellite_api,
+        FakeLogger(),
+    )
+    satellite_api.run = run
+    satellite_api.responses = [
+        dict(
+            error=None,
+            body={"id": 101, "targeting": {"hosts": [{"name": "host1", "id": 5}]}},
+        ),
+        dict(error=None, status=200, body="{}"),
+    ]
+    assert await run.trigger(run.hosts)
+
+    # The triggered batch is cancelled, the others are never started
+    assert satellite_api.requests == [
+        ("trigger", ({"playbook": "playbook"}, ["host1"])),
+        ("cancel", 101),
+    ]
+    assert list(run.running) == [5]
+    assert queue.messages == [
+        messages.playbook_run_update("host2", "play_id", CANCELLED, 0),
+        messages.playbook_run_finished(
+            "host2", "play_id", constants.RESULT_CANCEL, None
+        ),
+        messages.playbook_run_update("host3", "play_id", CANCELLED, 0),
+        messages.playbook_run_finished(
+            "host3", "play_id", constants.RESULT_CANCEL, None
+        ),
+    ]
+
+
+# Lets other tasks run, asyncio.sleep(0) is patched out by test_helper
+@types.coroutine
+def yield_to_loop():
+    yield
+
+
+@pytest.mark.asyncio
+async def test_cancel_before_admission():
+    run_monitor.clear()
+    queue = FakeQueue()
+    satellite_api = FakeSatelliteAPI()
+    run = Run(
+        ResponseQueue(queue),
+        "rem_id",
+        "play_id",
+        "account_no",
+        ["host1"],
+        "playbook",
+        {},
+        satellite_api,
+        FakeLogger(),
+    )
+    # The run waits for another one to leave
+    satellite_api.scheduler = RequestScheduler(max_runs=1)
+    await satellite_api.scheduler.admit()
+    task = asyncio.ensure_future(run.run())
+    await yield_to_loop()
+
+    await worker.cancel_run("play_id", ResponseQueue(queue), FakeLogger())
+    satellite_api.scheduler.leave()
+    old_verifier = playbook_verifier_adapter.verify
+    playbook_verifier_adapter.verify = lambda x: x
+    await task
+    playbook_verifier_adapter.verify = old_verifier
+
+    assert satellite_api.requests == []
+    assert queue.messages == [
+        messages.ack("play_id"),
+        messages.playbook_run_cancel_ack("play_id", constants.CANCEL_RESULT_CANCELLING),
+        messages.playbook_run_update("host1", "play_id", CANCELLED, 0),
+        messages.playbook_run_finished(
+            "host1", "play_id", constants.RESULT_CANCEL, None
+        ),
+        messages.playbook_run_completed(
+            "play_id",
+            constants.RESULT_CANCEL,
+            connection_code=None,
+            infrastructure_code=None,
+        ),
+    ]
+
+
+class RecordingPollCoordinator:
+    def __init__(self):
+        self.intervals = []
+
+    async def wait(self, interval):
+        self.intervals.append(interval)
+
+
+@pytest.mark.asyncio
+async def test_adaptive_polling():
+    queue = FakeQueue()
+    satellite_api = FakeSatelliteAPI()
+    satellite_api.poll_coordinator = RecordingPollCoordinator()
+    run = Run(
+        ResponseQueue(queue),
+        "rem_id",
+        "play_id",
+        "account_no",
+        ["host1"],
+        "playbook",
+        {
+            "text_update_full": False,
+            "adaptive_polling": True,
+            "poll_interval_min": 2000,
+            "poll_interval_max": 15000,
+        },
+        satellite_api,
+        FakeLogger(),
+    )
+    run.update_hosts([{"name": "host1", "id": 5}], 123)
+
+    def output(chunks, complete=False):
+        return dict(
+            error=None,
+            body={"outputs": [{"host_id": 5, "output": chunks, "complete": complete}]},
+        )
+
+    satellite_api.responses = [
+        output([]),
+        output([]),
+        output([]),
+        output([{"output": "x", "timestamp": 1.0}]),
+        output([{"output": "y", "timestamp": 2.0}]),
+        output([{"output": "Exit status: 0", "timestamp": 3.0}], True),
+    ]
+    assert await run.polling_loop()
+    # Idle polls back off up to the maximum, new output speeds polling up again
+    assert satellite_api.poll_coordinator.intervals == [5, 10, 15, 15, 10, 5]
+
+
+class AdvancingPollCoordinator:
+    def __init__(self, run, step):
+        self.run = run
+        self.step = step
+        self.now = 0.0
+
+    async def wait(self, interval):
+        self.now += self.step
+
+
+def deadline_scenario(config):
+    metrics.clear()
+    queue = FakeQueue()
+    satellite_api = FakeSatelliteAPI()
+    run = Run(
+        ResponseQueue(queue),
+        "rem_id",
+        "play_id",
+        "account_no",
+        ["host1", "host2"],
+        "playbook",
+        dict(config, text_update_full=False),
+        satellite_api,
+        FakeLogger(),
+    )
+    coordinator = AdvancingPollCoordinator(run, 40)
+    satellite_api.poll_coordinator = coordinator
+    run.clock = lambda: coordinator.now
+    run.started_at = 0.0
+    run.update_hosts([{"name": "host1", "id": 5}, {"name": "host2", "id": 6}], 123)
+    return queue, satellite_api, run
+
+
+def host_chunk(host_id, output, timestamp, complete=False):
+    return {
+        "host_id": host_id,
+        "output": [{"output": output, "timestamp": timestamp}] if output else [],
+        "complete": complete,
+    }
+
+
+@pytest.mark.asyncio
+async def test_stalled_hosts_are_finalized():
+    queue, satellite_api, run = deadline_scenario({"progress_timeout": 60000})
+    satellite_api.responses = [
+        dict(
+            error=None,
+            body={"outputs": [host_chunk(5, "x", 1.0), host_chunk(6, "", 0)]},
+        ),
+        dict(
+            error=None,
+            body={"outputs": [host_chunk(5, "y", 2.0), host_chunk(6, "", 0)]},
+        ),
+        dict(
+            error=None, body={"outputs": [host_chunk(5, "Exit status: 0", 3.0, True)]}
+        ),
+    ]
+    assert await run.polling_loop()
+    assert satellite_api.requests == [
+        ("outputs", (123, [5, 6], 0.0)),
+        ("outputs", (123, [5, 6], 1.0)),
+        ("outputs", (123, [5], 2.0)),
+    ]
+    assert queue.messages == [
+        messages.playbook_run_update(
+            "host2", "play_id", "No new output in 60 seconds", 0
+        ),
+        messages.playbook_run_finished(
+            "host2", "play_id", constants.HOST_RESULT_INFRA_FAILURE, None
+        ),
+        messages.playbook_run_update("host1", "play_id", "xyExit status: 0", 0),
+        messages.playbook_run_finished("host1", "play_id", constants.RESULT_SUCCESS),
+    ]
+    assert run.running == {}
+    assert metrics.get(HOSTS_STALLED) == 1
+
+
+@pytest.mark.asyncio
+async def test_host_timeout():
+    queue, satellite_api, run = deadline_scenario(
+        {"run_timeout": 50000, "host_timeout": 30000}
+    )
+    satellite_api.responses = [
+        dict(error=None, body={"outputs": [host_chunk(5, "x", 1.0)]}),
+    ]
+    assert await run.polling_loop()
+    assert satellite_api.requests == [("outputs", (123, [5, 6], 0.0))]
+    assert queue.messages == [
+        messages.playbook_run_update("host1", "play_id", "Host timed out", 0),
+        messages.playbook_run_finished(
+            "host1", "play_id", constants.HOST_RESULT_INFRA_FAILURE, None
+        ),
+        messages.playbook_run_update("host2", "play_id", "Host timed out", 0),
+        messages.playbook_run_finished(
+            "host2", "play_id", constants.HOST_RESULT_INFRA_FAILURE, None
+        ),
+    ]
+    assert metrics.get(HOSTS_TIMED_OUT) == 2
+    assert metrics.get(RUNS_TIMED_OUT) == 0
+
+
+@pytest.mark.asyncio
+async def test_run_timeout():
+    queue, satellite_api, run = deadline_scenario({"run_timeout": 30000})
+    satellite_api.responses = [
+        dict(error=None, body={"outputs": [host_chunk(5, "x", 1.0)]}),
+    ]
+    assert await run.polling_loop()
+    assert [message["host"] for message in queue.messages] == ["host1"] * 2 + [
+        "host2"
+    ] * 2
+    assert queue.messages[0]["console"] == "Playbook run timed out"
+    assert metrics.get(HOSTS_RUN_TIMEOUT) == 2
+    assert metrics.get(RUNS_TIMED_OUT) == 1
+
+
+@pytest.mark.asyncio
+async def test_missing_batch_outputs_is_remembered():
+    satellite_api = FakeSatelliteAPI()
+
+    def new_run():
+        run = Run(
+            ResponseQueue(FakeQueue()),
+            "rem_id",
+            "play_id",
+            "account_no",
+            ["host1"],
+            "playbook",
+            {},
+            satellite_api,
+            FakeLogger(),
+        )
+        run.update_hosts([{"name": "host1", "id": 5}], 123)
+        return run
+
+    done = {
+        "error": None,
+        "body": {"complete": True, "output": [{"output": "Exit status: 0"}]},
+    }
+    # A job invocation which is gone says nothing about the endpoint
+    satellite_api.responses = [
+        dict(error="Resource job_invocation not found by id '123'", status=404),
+        done,
+    ]
+    assert await new_run().polling_loop()
+    assert satellite_api.capabilities.batch_outputs is None
+
+    satellite_api.requests = []
+    satellite_api.responses = [
+        dict(error="Route job_invocations/123/outputs not found", status=404),
+        done,
+    ]
+    assert await new_run().polling_loop()
+    assert satellite_api.capabilities.batch_outputs is False
+
+    # Later runs go straight to polling hosts one by one
+    satellite_api.requests = []
+    satellite_api.responses = [done]
+    assert await new_run().polling_loop()
+    assert satellite_api.requests == [("output", (123, 5, None))]
@@ -0,0 +1,77 @@
+import pytest
+
+from fake_logger import FakeLogger
+from fake_queue import FakeQueue
+from receptor_satellite import worker
+from receptor_satellite.response.response_queue import constants, ResponseQueue
+from receptor_satellite.run_monitor import RunMonitor, Tombstone
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRun:
+    def __init__(self, playbook_run_id, result=None):
+        self.playbook_run_id = playbook_run_id
+        self.result = result
+
+
+@pytest.mark.asyncio
+async def test_finished_runs_leave_tombstones():
+    clock = FakeClock()
+    monitor = RunMonitor(clock=clock)
+    run = FakeRun("play_id")
+    assert await monitor.register(run)
+    assert await monitor.get("play_id") is run
+
+    run.result = constants.RESULT_SUCCESS
+    await monitor.done(run)
+    assert await monitor.get("play_id") == Tombstone(1000.0, "success")
+    assert not await monitor.register(FakeRun("play_id"))
+    assert len(monitor) == 1
+
+
+@pytest.mark.asyncio
+async def test_tombstones_expire():
+    clock = FakeClock()
+    monitor = RunMonitor(tombstone_ttl=60, clock=clock)
+    await monitor.register(FakeRun("old"))
+    await monitor.done(FakeRun("old", constants.RESULT_FAILURE))
+    clock.now += 30
+    await monitor.done(FakeRun("new", constants.RESULT_SUCCESS))
+
+    clock.now += 31
+    assert await monitor.get("old") is None
+    assert await monitor.get("new") == Tombstone(1030.0, "success")
+    assert await monitor.register(FakeRun("old"))
+
+
+@pytest.mark.asyncio
+async def test_tombstones_are_bounded():
+    monitor = RunMonitor(max_tombstones=2, clock=FakeClock())
+    live = FakeRun("live")
+    await monitor.register(live)
+    for i in range(5):
+        await monitor.done(FakeRun(f"run_{i}"))
+    assert len(monitor) == 3
+    assert await monitor.get("run_2") is None
+    assert await monitor.get("run_3") is not None
+    assert await monitor.get("live") is live
+
+
+@pytest.mark.asyncio
+async def test_cancel_finished_run(monkeypatch):
+    monitor = RunMonitor(clock=FakeClock())
+    monkeypatch.setattr(worker, "run_monitor", monitor)
+    await monitor.done(FakeRun("play_id", constants.RESULT_SUCCESS))
+    queue = FakeQueue()
+    await worker.cancel_run("play_id", ResponseQueue(queue), FakeLogger())
+    assert queue.messages[0]["status"] == constants.CANCEL_RESULT_FINISHED
+
+    await worker.cancel_run("unknown_id", ResponseQueue(queue), FakeLogger())
+    assert queue.messages[1]["status"] == constants.CANCEL_RESULT_FAILURE
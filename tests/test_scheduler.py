@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+
+from receptor_satellite.scheduler import InFlightLimit, RequestScheduler, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, interval):
+        self.sleeps.append(interval)
+        self.now += interval
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(asyncio, "sleep", clock.sleep)
+    bucket = TokenBucket(rate=2, capacity=3, clock=clock)
+
+    # The burst is served right away, the rest at the configured rate
+    for _ in range(3):
+        await bucket.take()
+    assert clock.sleeps == []
+    await bucket.take()
+    await bucket.take()
+    assert clock.sleeps == [0.5, 0.5]
+    assert clock.now == 101.0
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_refills_up_to_capacity(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(asyncio, "sleep", clock.sleep)
+    bucket = TokenBucket(rate=1, capacity=2, clock=clock)
+    await bucket.take()
+    await bucket.take()
+    clock.now += 60
+    for _ in range(3):
+        await bucket.take()
+    assert clock.sleeps == [1]
+
+
+@pytest.mark.asyncio
+async def test_in_flight_limit_is_shared():
+    limit = InFlightLimit(1)
+    first = RequestScheduler(rate=100, burst=100, in_flight=limit)
+    second = RequestScheduler(rate=100, burst=100, in_flight=limit)
+    await first.acquire()
+    waiter = asyncio.ensure_future(second.acquire())
+    await asyncio.wait([waiter], timeout=0.01)
+    assert not waiter.done()
+    first.release()
+    await asyncio.wait_for(waiter, 1)
+    second.release()
+
+
+@pytest.mark.asyncio
+async def test_runs_wait_for_admission():
+    scheduler = RequestScheduler(max_runs=1, in_flight=InFlightLimit(1))
+    await scheduler.admit()
+    waiter = asyncio.ensure_future(scheduler.admit())
+    await asyncio.wait([waiter], timeout=0.01)
+    assert not waiter.done()
+    assert scheduler.runs == 1
+
+    scheduler.leave()
+    await asyncio.wait_for(waiter, 1)
+    assert scheduler.runs == 1
+    scheduler.leave()
+    assert scheduler.runs == 0
@@ -0,0 +1,60 @@
+import pytest
+
+from receptor_satellite.satellite_api import SatelliteAPI, SessionPool
+from constants import PLUGIN_CONFIG
+
+
+def api(**kwargs):
+    config = dict(PLUGIN_CONFIG, **kwargs)
+    return SatelliteAPI(**config)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_apis_share_session():
+    pool = SessionPool()
+    first, second = api(), api()
+    first.session = await pool.acquire(first)
+    second.session = await pool.acquire(second)
+    assert first.session is second.session
+
+    await pool.release(first)
+    assert not second.session.closed
+    await pool.close_all()
+    assert second.session.closed
+
+
+@pytest.mark.asyncio
+async def test_different_satellites_get_different_sessions():
+    pool = SessionPool()
+    first, second = api(), api(url="http://elsewhere")
+    first.session = await pool.acquire(first)
+    second.session = await pool.acquire(second)
+    assert first.session is not second.session
+    await pool.close_all()
+
+
+@pytest.mark.asyncio
+async def test_released_session_is_kept_warm():
+    pool = SessionPool()
+    first = api()
+    first.session = session = await pool.acquire(first)
+    await pool.release(first)
+    assert not session.closed
+
+    second = api()
+    second.session = await pool.acquire(second)
+    assert second.session is session
+    await pool.close_all()
+
+
+@pytest.mark.asyncio
+async def test_closed_session_is_replaced():
+    pool = SessionPool()
+    first = api()
+    first.session = session = await pool.acquire(first)
+    await session.close()
+
+    second = api()
+    second.session = await pool.acquire(second)
+    assert second.session is not session
+    await pool.close_all()
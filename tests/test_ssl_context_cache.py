@@ -0,0 +1,44 @@
+import os
+import shutil
+import ssl
+
+import pytest
+
+from receptor_satellite.satellite_api import SatelliteAPI, SSLContextCache
+from receptor_satellite import satellite_api
+
+URL = "https://satellite.example.com"
+SYSTEM_CA_FILE = ssl.get_default_verify_paths().cafile
+
+
+@pytest.fixture
+def ca_file(tmp_path):
+    if not SYSTEM_CA_FILE or not os.path.exists(SYSTEM_CA_FILE):
+        pytest.skip("No system CA bundle available")
+    path = str(tmp_path / "ca.pem")
+    shutil.copyfile(SYSTEM_CA_FILE, path)
+    yield path
+
+
+def test_context_is_reused():
+    cache = SSLContextCache()
+    assert cache.get(URL, None, True) is cache.get(URL, None, True)
+    assert cache.get(URL, None, True) is not cache.get(URL, None, False)
+
+
+def test_context_is_replaced_when_ca_file_changes(ca_file):
+    cache = SSLContextCache()
+    context = cache.get(URL, ca_file, True)
+    assert cache.get(URL, ca_file, True) is context
+
+    stat = os.stat(ca_file)
+    os.utime(ca_file, (stat.st_atime, stat.st_mtime + 10))
+    assert cache.get(URL, ca_file, True) is not context
+
+
+def test_apis_share_context():
+    satellite_api.ssl_context_cache.clear()
+    first = SatelliteAPI("user", "pass", URL, None)
+    second = SatelliteAPI("user", "pass", URL, None)
+    assert first.context is second.context
+    assert first.context.verify_mode == ssl.CERT_REQUIRED